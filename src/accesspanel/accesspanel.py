@@ -50,15 +50,30 @@ Additional features:
     ANSI codes are displayed in the AccessPanel.  See the 'ANSI'
     extension for more details.
 
+Messages sent to the AccessPanel are queued and displayed together,
+at most once every FLUSH_DELAY milliseconds, so that a lot of
+messages received in a short time don't freeze the window.  The
+number of lines kept in the output field can be limited by setting
+'scrollback':  the oldest lines are then removed.
+
 """
 
-from collections import OrderedDict
+from collections import Counter, OrderedDict, deque
+from threading import Lock
+import time
 
 import wx
 
 from . import extensions
 
 ## Constants
+# Minimum delay between two displays of queued messages (in ms)
+FLUSH_DELAY = 40
+
+# Proportion of extra lines allowed beyond the scrollback limit
+# before the oldest lines are removed (all at once)
+TRIM_MARGIN = 0.1
+
 # Navigation keys (arrows, home/end, pageUp/pageDown...)
 NAV_KEYS = set()
 NAV_KEYS.add(wx.WXK_UP)
@@ -139,6 +154,7 @@ class AccessPanel(wx.Panel):
         OnInput: text is sent by the user pressing RETURN.
         ClearInput: the input text is cleared.
         Send: send text to the output field (it will added in the output).
+        FormatMessage: change a queued message before it's displayed.
 
     """
 
@@ -149,6 +165,15 @@ class AccessPanel(wx.Panel):
         self.extensions = OrderedDict()
         self.rich = rich
         self.screenreader_support = True
+        self.scrollback = 0
+        self.line_sizes = deque()
+
+        # Queue of messages waiting to be displayed
+        self.pending = []
+        self.pending_lock = Lock()
+        self.flush_posted = False
+        self.last_flush = 0
+        self.flush_stats = Counter()
 
         # Build the extensions
         if history:
@@ -226,6 +251,7 @@ class AccessPanel(wx.Panel):
     def ClearOutput(self):
         """Clear the output."""
         self.editing_pos = 0
+        self.line_sizes.clear()
         self.output.Clear()
 
         # Trigger extensions
@@ -240,36 +266,133 @@ class AccessPanel(wx.Panel):
         """
         pass
 
+    def FormatMessage(self, message):
+        """Return the queued message as it should be displayed.
+
+        This method is called in the main thread, just before the
+        message is displayed, and can be overridden in child classes.
+        Returning an empty message will prevent it from being displayed.
+
+        """
+        return message
+
     def OnMessage(self, e):
-        """A message is received and should be displayed in the output field.
+        """Some messages are queued and should be displayed.
 
         This method is directly called in answer to the EVT_MESSAGE.
-        It displays the received text in the window, being careful to
-        put the cursor where it was before, with the typed text in
-        the input field.
+        If the last display was less than FLUSH_DELAY milliseconds
+        ago, the messages are displayed later, with the ones received
+        in the meantime.
 
         """
-        origin = pos = self.output.GetInsertionPoint()
-        if not self.screenreader_support:
-            self.output.Freeze()
+        delay = FLUSH_DELAY - (time.monotonic() - self.last_flush) * 1000
+        if delay > 0:
+            wx.CallLater(int(delay) + 1, self.FlushMessages)
+        else:
+            self.FlushMessages()
+
+    def FlushMessages(self):
+        """Display all the queued messages at once."""
+        with self.pending_lock:
+            pending = self.pending
+            self.pending = []
+            self.flush_posted = False
+
+        if not self or not pending:
+            return
+
+        self.last_flush = time.monotonic()
+        messages = []
+        for message, mark in pending:
+            message = self.FormatMessage(message)
+            if message:
+                messages.append((message, mark))
+
+        if messages:
+            message, mark = self.CoalesceMessages(messages)
+            self.flush_stats["flushes"] += 1
+            self.flush_stats["messages"] += len(messages)
+            self.flush_stats["characters"] += len(message)
+            self.DisplayMessage(message, mark)
+
+    def CoalesceMessages(self, messages):
+        """Join the messages, return the message and mark to display.
+
+        The messages are a list of tuples (message, mark).  If the
+        messages are all str, they are joined in a str.  Otherwise,
+        they are joined in an object of the same type as the first
+        message that isn't a str (like CocoMUD's StyledText), which
+        should have 'parse' and 'join' class methods.  The mark of
+        the last message having one is kept, moved to be relative to
+        the beginning of the joined message.
+
+        """
+        cls = str
+        for message, mark in messages:
+            if not isinstance(message, str):
+                cls = type(message)
+                break
+
+        if cls is str:
+            # New lines are normalized and count as one character in rich
+            # text fields, as two otherwise
+            separator = "\r\n"
+            messages = [("\r\n".join(message.splitlines()), mark) for \
+                    message, mark in messages]
+            size = 1 if self.rich else 2
+        else:
+            separator = "\n"
+            messages = [(cls.parse(message.replace("\r", "")) if \
+                    isinstance(message, str) else message, mark) for \
+                    message, mark in messages]
+            size = 1
+
+        offset = 0
+        last_mark = None
+        for message, mark in messages:
+            if mark is not None:
+                last_mark = offset + mark
+
+            text = str(message)
+            offset += len(text) + size
+            if cls is str and self.rich:
+                offset -= text.count("\r\n")
+
+        if cls is str:
+            message = separator.join(message for message, mark in messages)
+        else:
+            message = cls.join(separator,
+                    [message for message, mark in messages])
 
-        message = e.GetValue()
-        mark = e.GetPos()
+        return message, last_mark
 
-        # Normalize new lines
-        message = "\r\n".join(message.splitlines())
+    def DisplayMessage(self, message, mark=None):
+        """Display the message in the output field.
+
+        The text is displayed in the window, being careful to put the
+        cursor where it was before, with the typed text in the input
+        field.  If mark is set, the cursor is moved at this position
+        in the displayed message instead.
+
+        """
+        pos = self.output.GetInsertionPoint()
+        point = self.editing_pos
+        if not self.screenreader_support:
+            self.output.Freeze()
 
         # Modify the text based on extensions
         for extension in self.extensions.values():
             message = extension.OnMessage(message)
             if not message:
+                if not self.screenreader_support:
+                    self.output.Thaw()
                 return
 
+        message = str(message)
+
         if not message.endswith("\r\n"):
             message += "\r\n"
 
-        # Get the text before the editing line
-        output = self.output.GetRange(0, self.editing_pos)
         input = self.input
 
         # Clears the output field and pastes the text back in
@@ -292,18 +415,69 @@ class AccessPanel(wx.Panel):
         for extension in self.extensions.values():
             extension.PostMessage(message)
 
+        # Remember the size of each line, to remove the oldest ones
+        newline = 1 if self.rich else 2
+        for line in message.replace("\r\n", "\n").split("\n")[:-1]:
+            self.line_sizes.append(len(line) + newline)
+
         if not self.screenreader_support:
             self.output.Thaw()
 
         # If there's a mark
-        if mark:
-            self.output.SetInsertionPoint(origin + mark)
+        if mark is not None:
+            self.output.SetInsertionPoint(point + mark)
         else:
             self.output.SetInsertionPoint(pos)
 
+        self.TrimOutput()
+
+    def TrimOutput(self):
+        """Remove the oldest lines beyond the scrollback limit.
+
+        To avoid modifying the output field with every message, lines
+        are only removed when there are more than TRIM_MARGIN extra
+        lines, and then all the extra lines are removed at once.
+        The editing position, the cursor and the extensions are
+        updated accordingly.
+
+        """
+        limit = self.scrollback
+        if not limit or len(self.line_sizes) <= limit * (1 + TRIM_MARGIN):
+            return
+
+        size = 0
+        while len(self.line_sizes) > limit:
+            size += self.line_sizes.popleft()
+
+        size = min(size, self.editing_pos)
+        pos = self.output.GetInsertionPoint()
+        self.output.Remove(0, size)
+        self.editing_pos -= size
+        self.output.SetInsertionPoint(max(0, pos - size))
+
+        # Trigger extensions
+        for extension in self.extensions.values():
+            extension.OnTrimOutput(size)
+
     def Send(self, message, pos=None):
-        """Create an event to send the message to the window."""
-        evt = MessageEvent(myEVT_MESSAGE, -1, message, pos)
+        """Queue the message to be displayed in the window.
+
+        This method can be called from any thread.  Only one event
+        is posted for all the messages queued before it's handled.
+
+        """
+        with self.pending_lock:
+            self.pending.append((message, pos))
+            depth = len(self.pending)
+            if depth > self.flush_stats["max_depth"]:
+                self.flush_stats["max_depth"] = depth
+
+            if self.flush_posted:
+                return
+
+            self.flush_posted = True
+
+        evt = MessageEvent(myEVT_MESSAGE, -1)
         wx.PostEvent(self, evt)
 
     def OnKeyDown(self, e):
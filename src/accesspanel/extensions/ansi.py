@@ -26,11 +26,12 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import re, string
+import re
 
 import wx
 import wx.lib.colourdb
 
+from styled_text import StyledText
 from .base import BaseExtension
 
 ## Constants
@@ -134,127 +135,105 @@ class ANSI(BaseExtension):
         self.start_mark = None
         self.last_mark = None
 
-    def OnMessage(self, message):
-        """Interpret the ANSI codes."""
+    def OnTrimOutput(self, size):
+        """The beginning of the output has been removed."""
+        if self.start_mark is not None:
+            self.start_mark = max(0, self.start_mark - size)
 
-        # Variables
-        point = self.panel.editing_pos
-        ansi_stage = 1
-        ansi_buffer = ""
-        clean_buffer = ""
-        char_index = 0
-
-        def select_colors(code):
-            """
-            Transforms ANSI sequences in a format specifier
-            """
-
-            match = RE_CODE.match(code)
-
-            # ANSI style sequences have tree parts
-            p1, p2, p3 = match.groups()
-            brightness, foreground, background = (None, None, None)
-
-            if p1:
-                p1 = int(p1.strip())
-
-                if p1 in (0, 1, 4, 7):
-                    brightness = p1
-                elif p1 in range(30, 38):
-                    foreground = p1
-                elif p1 in range(40, 48):
-                    background = p1
-
-            if p2:
-                p2 = int(p2.strip())
-
-                if p2 in range(30, 40):
-                    foreground = p2
-                elif p2 in range(40, 50):
-                    background = p2
-
-            if p3:
-                p3 = int(p3.strip())
-
-                if p3 in range(40, 50):
-                    background = p3
-
-            if brightness == 1:
-                brightness = BRIGHT
-            elif brightness == 4:
-                brightness = UNDERLINE
-            else:
-                brightness = NORMAL
+        self.modifiers = [(max(0, point - size), style) for point, style in \
+                self.modifiers]
 
+    def OnMessage(self, message):
+        """Interpret the ANSI codes.
+
+        The message can be a str containing ANSI codes, or an object
+        with 'text' and 'codes' attributes (like CocoMUD's StyledText)
+        if the codes have already been parsed.  The text without
+        codes is returned.
 
-            # Now the colors
-            colorlist = None
+        """
+        point = self.panel.editing_pos
+        if isinstance(message, str):
+            # We must discard \r characters because it causes problems
+            # at formatting time
+            message = StyledText.parse(message.replace("\r", ""))
+
+        for position, parameters in message.codes:
+            colors = self.select_colors(parameters)
+            if colors:
+                self.modifiers.append((point + position, colors))
+
+        return message.text
+
+    def select_colors(self, code):
+        """Transforms ANSI sequences in a format specifier."""
+        match = RE_CODE.match(code)
+        if match is None:
+            return None
+
+        # ANSI style sequences have tree parts
+        p1, p2, p3 = match.groups()
+        brightness, foreground, background = (None, None, None)
+
+        if p1:
+            p1 = int(p1.strip())
+
+            if p1 in (0, 1, 4, 7):
+                brightness = p1
+            elif p1 in range(30, 38):
+                foreground = p1
+            elif p1 in range(40, 48):
+                background = p1
+
+        if p2:
+            p2 = int(p2.strip())
+
+            if p2 in range(30, 40):
+                foreground = p2
+            elif p2 in range(40, 50):
+                background = p2
+
+        if p3:
+            p3 = int(p3.strip())
+
+            if p3 in range(40, 50):
+                background = p3
+
+        if brightness == 1:
+            brightness = BRIGHT
+        elif brightness == 4:
+            brightness = UNDERLINE
+        else:
+            brightness = NORMAL
+
+
+        # Now the colors
+        colorlist = None
+
+        if brightness == BRIGHT:
+            colorlist = self.bright_colors
+        elif brightness == UNDERLINE:
+            colorlist = self.dark_colors
+        else:
+            colorlist = self.normal_colors
+
+        if foreground:
+            foreground = colorlist[foreground+10]
+        else:
+            foreground = self.default_foreground
+
+        if background:
+            background = colorlist[background]
+        else:
 
             if brightness == BRIGHT:
-                colorlist = self.bright_colors
+                background = wx.BLACK
             elif brightness == UNDERLINE:
-                colorlist = self.dark_colors
+                background = wx.YELLOW
             else:
-                colorlist = self.normal_colors
-
-            if foreground:
-                foreground = colorlist[foreground+10]
-            else:
-                foreground = self.default_foreground
-
-            if background:
-                background = colorlist[background]
-            else:
-
-                if brightness == BRIGHT:
-                    background = wx.BLACK
-                elif brightness == UNDERLINE:
-                    background = wx.YELLOW
-                else:
-                    background = self.default_background
-
-            return (foreground, background)
-
-        # We must iterate over the entire message string
-        while char_index < len(message):
-
-            # First stage: look for a 0x1B character and switch to second stage
-            if ansi_stage == 1:
-                if message[char_index] == "\x1B":
-                    ansi_stage = 2
-                else:
-
-                    # We must discard \r characters because it causes problems at formatting time
-                    if message[char_index] != "\r":
-                        clean_buffer += message[char_index]
-
-            # Second stage: look for a validation character (an '[')
-            elif ansi_stage == 2:
-                if message[char_index] == "[":
-                    ansi_stage = 3
-                    ansi_buffer = ""
-                else:
-                    ansi_stage = 1
-
-                    # Just add the two last characters
-                    clean_buffer += message[char_index-1:char_index]
-
-            # Last stage: process ANSI command with arguments
-            elif ansi_stage == 3:
-                if message[char_index] in string.digits+";":
-                    ansi_buffer += message[char_index]
-
-                # Now we have all arguments and the command (too generic detection for now...)
-                else:
-                    ansi_stage = 1
-                    self.modifiers.append((point+len(clean_buffer), select_colors(ansi_buffer)))
-
-                    ansi_buffer = ""
-
-            char_index += 1
-
+                background = self.default_background
 
-        return clean_buffer
+        return (foreground, background)
 
     def PostMessage(self, message):
         """Applies ANSI style to text"""
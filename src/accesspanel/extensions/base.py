@@ -72,6 +72,10 @@ class BaseExtension:
         """The output has been cleared."""
         pass
 
+    def OnTrimOutput(self, size):
+        """The first 'size' characters of the output have been removed."""
+        pass
+
     def OnKeyDown(self, modifiers, key):
         """Add keyboard handling for this extension.
 
@@ -34,6 +34,8 @@ already handles a great deal of the Telnet protocol.
 
 """
 
+import codecs
+from collections import Counter
 import os
 from random import randint
 import re
@@ -41,25 +43,47 @@ import socket
 from telnetlib import Telnet, WONT, WILL, ECHO, NOP, AYT, IAC, GA
 import threading
 import time
+import zlib
 
 from twisted.internet import reactor
 from twisted.internet.error import ConnectionDone
 from twisted.internet.protocol import ReconnectingClientFactory
-from twisted.conch.telnet import Telnet
+from twisted.conch.telnet import Telnet, SB, SE
 import wx
 from wx.lib.pubsub import pub
 
 from log import logger
+from oob import GMCP, GMCP_SUPPORTS, MSDP, encode_GMCP, encode_MSDP, \
+        parse_GMCP, parse_MSDP
+from outbound import OutboundPipeline
 from screenreader import ScreenReader
-from screenreader import ScreenReader
+from styled_text import StyledText
+from trigger_worker import TriggerWorker
+from version import BUILD
 
 # Constants
-ANSI_ESCAPE = re.compile(r'\x1b[^m]*m')
+LINE_TIMEOUT = 0.1
+GA_MAX_AGE = 0.2
+GA_MAX_SIZE = 64 * 1024
+GA_MAX_MISSES = 5
+COMPRESS2 = bytes([86])
+MCCP_START = IAC + SB + COMPRESS2 + IAC + SE
 
 class Client(Telnet):
 
     """Class to receive data from the MUD using a Telnet protocol."""
 
+    worker = None
+    _pipeline = None
+
+    @property
+    def pipeline(self):
+        """Return the outbound pipeline, creating it if needed."""
+        if self._pipeline is None:
+            self._pipeline = OutboundPipeline(self)
+
+        return self._pipeline
+
     def disconnect(self):
         """Disconnect, close the client."""
         if self.transport:
@@ -70,9 +94,31 @@ class Client(Telnet):
     def connectionMade(self):
         """Established connection, send the differed commands."""
         self.has_GA = False
-        self.queue = b""
+        self.queue = []
+        self.queue_size = 0
+        self.missed_GA = 0
+        self.flushes = Counter()
         self.defer = None
         self.anti_idle = None
+        self.encoding = None
+        self.decoder = None
+        self.partial = ""
+        self.partial_timer = None
+        self.decompressor = None
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self.negotiationMap[COMPRESS2] = self.start_compression
+        self.negotiationMap[GMCP] = self.handle_GMCP
+        self.negotiationMap[MSDP] = self.handle_MSDP
+        self.factory.session.oob.clear()
+        self.worker = None
+
+        # Match the triggers in a thread (see 'trigger_worker'), this
+        # doesn't protect against a regular expression that never ends
+        if self.factory.engine.settings["options.output.trigger_worker"]:
+            self.worker = TriggerWorker(self)
+            self.worker.start()
+
         host = self.transport.getPeer().host
         port = self.transport.getPeer().port
         log = logger("client")
@@ -89,56 +135,303 @@ class Client(Telnet):
 
     def connectionLost(self, reason):
         """The connection was lost."""
-        self.send_queue()
+        self.send_queue("close")
+        if self.decoder:
+            self.receive_text(self.decoder.decode(b"", final=True))
+        self.flush_partial()
+        if self.worker:
+            self.worker.stop()
+        if self._pipeline:
+            self._pipeline.queue.clear()
+
         host = self.transport.getPeer().host
         port = self.transport.getPeer().port
         log = logger("client")
         log.info("Lost Connection on {host}:{port}: {reason}".format(
                 host=host, port=port, reason=reason.type))
+        if self.compressed_bytes:
+            log.debug("MCCP: received {} compressed bytes, {} " \
+                    "uncompressed".format(self.compressed_bytes,
+                    self.decompressed_bytes))
+        log.debug("Go-Ahead queue flushes: {}".format(", ".join(
+                "{}={}".format(name, count) for name, count in sorted(
+                self.flushes.items())) or "none"))
         wx.CallAfter(pub.sendMessage, "disconnect", client=self,
                 reason=reason)
         if reason.type is ConnectionDone:
             self.factory.stopTrying()
 
+    def enableRemote(self, option):
+        """Accept the options the server offers that we support."""
+        return option in (COMPRESS2, GMCP, MSDP)
+
+    def telnet_WILL(self, option):
+        """The server offers an option, greet it once it's enabled."""
+        enabled = self.getOptionState(option).him.state == "yes"
+        Telnet.telnet_WILL(self, option)
+        if enabled or self.getOptionState(option).him.state != "yes":
+            return
+
+        if option == GMCP:
+            self.send_GMCP("Core.Hello", {"client": "CocoMUD",
+                    "version": str(BUILD)})
+            self.send_GMCP("Core.Supports.Set", GMCP_SUPPORTS)
+        elif option == MSDP:
+            self.send_MSDP({"LIST": "REPORTABLE_VARIABLES"})
+
+    def disableRemote(self, option):
+        """The server disables an option."""
+        if option == COMPRESS2:
+            self.decompressor = None
+
+    def dataReceived(self, data):
+        """Receive raw data from the server, decompressing it if needed.
+
+        When MCCP (compression) starts, the rest of the data is
+        compressed.  Since the start of compression can be in the
+        middle of a packet, the data is split:  the beginning is
+        handled before the compression starts, and the rest is
+        decompressed.
+
+        """
+        while data:
+            if self.decompressor:
+                self.compressed_bytes += len(data)
+                data, rest = self.decompress(data)
+                self.decompressed_bytes += len(data)
+                Telnet.dataReceived(self, data)
+                data = rest
+                continue
+
+            end = self.find_compression_start(data)
+            if end < 0:
+                Telnet.dataReceived(self, data)
+                break
+
+            # Handle the data until the compression starts
+            Telnet.dataReceived(self, data[:end])
+            data = data[end:]
+
+    def find_compression_start(self, data):
+        """Return the index after 'IAC SB COMPRESS2 IAC SE', or -1.
+
+        The sequence can be split over two packets, in which case
+        the Telnet parser is in the middle of a subnegotiation.
+
+        """
+        if not self.getOptionState(COMPRESS2).him.state == "yes":
+            return -1
+
+        if self.state == "escaped":
+            prefix = MCCP_START[1:]
+        elif self.state == "subnegotiation" and not self.commands:
+            prefix = MCCP_START[2:]
+        elif self.state == "subnegotiation" and self.commands == [COMPRESS2]:
+            prefix = MCCP_START[3:]
+        elif self.state == "subnegotiation-escaped" and \
+                self.commands == [COMPRESS2]:
+            prefix = MCCP_START[4:]
+        else:
+            prefix = None
+
+        if prefix and data.startswith(prefix):
+            return len(prefix)
+
+        index = data.find(MCCP_START)
+        if index >= 0:
+            index += len(MCCP_START)
+
+        return index
+
+    def start_compression(self, data):
+        """The server begins to compress the data (MCCP v2)."""
+        log = logger("client")
+        log.debug("MCCP: starting compression")
+        self.decompressor = zlib.decompressobj()
+
+    def decompress(self, data):
+        """Decompress the data.
+
+        Return a tuple (decompressed, rest) where rest is the data
+        received after the end of the compressed stream, which
+        isn't compressed.
+
+        """
+        log = logger("client")
+        try:
+            decompressed = self.decompressor.decompress(data)
+        except zlib.error:
+            log.exception("MCCP: the compressed data is corrupted")
+            self.decompressor = None
+            self.dont(COMPRESS2).addErrback(lambda failure: None)
+            return b"", b""
+
+        if self.decompressor.eof:
+            rest = self.decompressor.unused_data
+            log.debug("MCCP: end of compression")
+            self.decompressor = None
+            return decompressed, rest
+
+        return decompressed, b""
+
+    def send_GMCP(self, package, value=None):
+        """Send a GMCP message to the server."""
+        self.requestNegotiation(GMCP, encode_GMCP(package, value))
+
+    def send_MSDP(self, variables):
+        """Send MSDP variables (a dictionary) to the server."""
+        self.requestNegotiation(MSDP, encode_MSDP(variables))
+
+    def handle_GMCP(self, data):
+        """Receive a GMCP message."""
+        data = b"".join(data)
+        try:
+            package, value = parse_GMCP(data)
+        except ValueError:
+            log = logger("client")
+            log.warning("GMCP: can't read the message {}".format(
+                    repr(data)))
+            return
+
+        if package:
+            self.handle_OOB(package, value)
+
+    def handle_MSDP(self, data):
+        """Receive MSDP variables.
+
+        The server answers to the first request with the list of
+        variables it can report, and the client asks to report all
+        of them.  The variables are stored in the 'MSDP' package.
+
+        """
+        variables = parse_MSDP(b"".join(data))
+        for name, value in variables.items():
+            if name == "REPORTABLE_VARIABLES":
+                if isinstance(value, str):
+                    value = [value]
+                self.send_MSDP({"REPORT": value})
+
+            self.handle_OOB("MSDP." + name, value)
+
+    def handle_OOB(self, package, value):
+        """Update the out-of-band state and fire the events.
+
+        The state is kept in the session ('session.oob').  The events
+        watching the package (or one of its parent packages) are
+        executed with the package's new value.
+
+        """
+        world = self.factory.world
+        with world.lock:
+            value = self.factory.session.oob.update(package, value)
+            events = [event for event in world.events if event.test(package)]
+            for event in events:
+                event.sharp_engine = self.factory.sharp_engine
+                try:
+                    event.execute(package, value)
+                except Exception:
+                    log = logger("client")
+                    log.exception("The event {} failed execution".format(
+                            repr(event.package)))
+
     def applicationDataReceived(self, data):
         """Receive something."""
         if self.has_GA:
-            self.queue += data
-            if self.defer:
-                self.defer.cancel()
-            self.defer = reactor.callLater(0.2, self.send_queue)
+            self.queue.append(data)
+            self.queue_size += len(data)
+            if self.queue_size >= GA_MAX_SIZE:
+                self.send_queue("size")
+            elif self.defer is None:
+                self.defer = reactor.callLater(GA_MAX_AGE, self.send_queue,
+                        "age")
         else:
-            if self.queue:
-                data = self.queue + b"\r\n" + data
-                self.queue = b""
+            self.receive_text(self.decode(data))
+
+    def decode(self, data):
+        """Decode the received bytes and return a str.
+
+        The decoder is kept between calls, so that a character split
+        across two packets is decoded when its last byte arrives.
+
+        """
+        encoding = self.factory.engine.settings["options.general.encoding"]
+        if self.decoder is None or encoding != self.encoding:
+            decoder = codecs.getincrementaldecoder(encoding)
+            self.decoder = decoder(errors="replace")
+            self.encoding = encoding
+
+        return self.decoder.decode(data)
 
-            # Cancel the deferred, if exists
-            if self.defer:
-                self.defer.cancel()
-                self.defer = None
+    def receive_text(self, text):
+        """Handle the decoded text, holding back an incomplete line.
 
-            encoding = self.factory.engine.settings["options.general.encoding"]
-            msg = data.decode(encoding, errors="replace")
+        Only complete lines are sent to 'handle_lines'.  The last
+        line, if it doesn't end with a line break, is kept until the
+        next packet completes it, the server sends a Go-Ahead, or
+        'LINE_TIMEOUT' seconds have passed (prompts often don't end
+        with a line break).
+
+        """
+        text = self.partial + text
+        complete, newline, partial = text.rpartition("\n")
+        self.partial = partial
+        if newline:
+            with self.factory.world.lock:
+                self.handle_lines(complete)
+
+        if partial:
+            if self.partial_timer is None:
+                self.partial_timer = reactor.callLater(LINE_TIMEOUT,
+                        self.flush_partial)
+        elif self.partial_timer:
+            self.partial_timer.cancel()
+            self.partial_timer = None
+
+    def flush_partial(self):
+        """Handle the incomplete line, not waiting for it to complete."""
+        if self.partial_timer and self.partial_timer.active():
+            self.partial_timer.cancel()
+        self.partial_timer = None
+
+        if self.partial:
+            partial = self.partial
+            self.partial = ""
             with self.factory.world.lock:
-                self.handle_lines(msg)
+                self.handle_lines(partial)
 
-    def send_queue(self):
-        old_GA = self.has_GA
-        self.has_GA = False
+    def send_queue(self, reason):
+        """Handle the data received since the last Go-Ahead.
+
+        The server sends a Go-Ahead after its output is complete,
+        therefore the data is queued until then, to be handled as
+        one message.  The queue is also sent when its oldest data has
+        waited for 'GA_MAX_AGE' seconds, or when it contains more
+        than 'GA_MAX_SIZE' bytes.  The reason is counted in
+        'self.flushes'.  If the server doesn't send a Go-Ahead
+        anymore, the data stops being queued.
+
+        """
+        if self.defer and self.defer.active():
+            self.defer.cancel()
         self.defer = None
+
+        if reason == "age":
+            self.missed_GA += 1
+            if self.missed_GA >= GA_MAX_MISSES:
+                self.has_GA = False
+
         if self.queue:
-            queue = self.queue
-            self.queue = b""
-            self.applicationDataReceived(queue)
-        self.has_GA = old_GA
+            self.flushes[reason] += 1
+            queue = b"".join(self.queue)
+            self.queue = []
+            self.queue_size = 0
+            self.receive_text(self.decode(queue))
 
     def handle_GA(self, *args, **kwargs):
         """Handle the Telnet Go-Ahead."""
-        self.has_GA = False
-        if self.queue:
-            queue = self.queue
-            self.queue = b""
-            self.applicationDataReceived(queue)
+        self.send_queue("GA")
+        self.flush_partial()
+        self.missed_GA = 0
         self.has_GA = True
 
     def reverse_anti_idle(self, verbose=False, to_panel=False):
@@ -181,7 +474,55 @@ class Client(Telnet):
         self.running = True
 
     def handle_lines(self, msg):
-        """Handle multiple lines of text."""
+        """Handle multiple lines of text.
+
+        The lines are first matched against the triggers, then the
+        matching triggers are executed and the text is displayed.
+        If the trigger worker is running, the matching happens in
+        the worker thread and the rest is done when the reactor
+        receives the result.
+
+        """
+        if self.worker:
+            self.worker.submit(msg)
+        else:
+            self.handle_matches(self.match_lines(msg))
+
+    def match_lines(self, msg):
+        """Match the lines against the world's triggers.
+
+        This method doesn't execute the triggers, it doesn't modify
+        anything and can be called from the trigger worker.  It
+        yields tuples (line, found) where line is a StyledText
+        (parsed once, the triggers test its text without ANSI codes)
+        and found is a list of tuples (trigger, match), in evaluation
+        order (see 'TriggerSet.matches').
+
+        Without the trigger worker, the lines are matched lazily:
+        each line is matched when the previous one has been handled,
+        so that triggers created by a trigger apply to the next lines
+        of the same message.  In the trigger worker, all the lines of
+        the message are matched before any trigger is executed:
+        triggers created or modified by a trigger only apply to the
+        following messages.
+
+        """
+        world = self.factory.world
+        for line in msg.splitlines():
+            line = StyledText.parse(line)
+            with world.lock:
+                trigger_set = world.trigger_set
+
+            found = trigger_set.matches(line.text)
+            yield line, found
+
+    def handle_matches(self, matches):
+        """Execute the matched triggers and display the lines.
+
+        The matches are the ones yielded by 'match_lines'.  This
+        method should be called in the reactor thread.
+
+        """
         mark = None
         lines = []
         no_ansi_lines = []
@@ -192,29 +533,11 @@ class Client(Telnet):
         else:
             nl = "\r\n"
 
-        for line in msg.splitlines():
-            no_ansi_line = ANSI_ESCAPE.sub('', line)
+        for line, found in matches:
             display = True
-            matches = []
-            for trigger in self.factory.world.triggers:
+            replaced = False
+            for trigger, match in found or ():
                 trigger.sharp_engine = self.factory.sharp_engine
-                try:
-                    match = trigger.test(no_ansi_line)
-                except Exception:
-                    log = logger("client")
-                    log.exception("The trigger {} failed".format(
-                            repr(trigger.reaction)))
-                else:
-                    if match:
-                        matches.append((trigger, match))
-
-            if matches:
-                if len(matches) > 1:
-                    matches.sort(
-                        key=lambda c: len(c[0].reaction), reverse=True
-                    )
-
-                trigger, match = matches[0]
                 trigger.set_variables(match)
                 try:
                     trigger.execute()
@@ -229,25 +552,26 @@ class Client(Telnet):
                     before = nl.join([l for l in no_ansi_lines])
                     mark = len(before) + len(nl)
 
-                # Handle triggers with substitution
-                if trigger.substitution:
+                # Handle triggers with substitution, the first one wins
+                if trigger.substitution and not replaced:
                     display = False
-                    replacement = trigger.replace()
+                    replaced = True
+                    replacement = StyledText.parse(trigger.replace())
                     lines.extend(replacement.splitlines())
 
             if display:
                 if self.factory.strip_ansi:
-                    lines.append(no_ansi_line)
+                    lines.append(line.without_codes())
                 else:
                     lines.append(line)
 
-                if no_ansi_line.strip():
-                    no_ansi_lines.append(no_ansi_line)
+                if line.text.strip():
+                    no_ansi_lines.append(line.text)
 
         # Handle the remaining text
         try:
-            lines = [l for l in lines if l]
-            self.handle_message("\r\n".join(lines), mark=mark)
+            lines = [l for l in lines if l.text or l.codes]
+            self.handle_message(StyledText.join("\r\n", lines), mark=mark)
         except Exception:
             log = logger("client")
             log.exception(
@@ -258,7 +582,7 @@ class Client(Telnet):
         """When the client receives a message.
 
         Args:
-            msg: the text to be displayed (str)
+            msg: the text to be displayed (str or StyledText)
             force_TTS: should the text be spoken regardless?
             screen: should the text appear on screen?
             speech: should the speech be enabled?
@@ -266,14 +590,19 @@ class Client(Telnet):
             mark: the index where to move the cursor.
 
         """
-        no_ansi_msg = ANSI_ESCAPE.sub('', msg)
+        if isinstance(msg, str):
+            raw = msg
+            msg = StyledText.parse(msg)
+        else:
+            raw = msg.ansi
+
+        no_ansi_msg = msg.text
         self.factory.session.log_message(no_ansi_msg)
         if screen:
             if self.factory.engine.redirect_message:
-                self.factory.engine.redirect_message(msg)
-            else:
-                wx.CallAfter(pub.sendMessage, "message", client=self,
-                    message=msg, mark=mark)
+                self.factory.engine.redirect_message(raw)
+            elif self.factory.panel:
+                self.factory.panel.Send(msg, pos=mark)
 
         # In any case, tries to find the TTS
         panel = self.factory.panel
@@ -293,54 +622,38 @@ class Client(Telnet):
                 ScreenReader.talk(no_ansi_msg, speech=speech, braille=braille,
                         interrupt=interrupt)
 
-    def write(self, text, alias=True):
-        """Write text to the client."""
+    def write(self, text, alias=True, priority=None):
+        """Write text to the client, through the outbound pipeline.
+
+        The priority is used by the send queue:  commands entered
+        by the user (outbound.USER) are sent before the commands
+        sent by scripts (outbound.SCRIPT).  Without priority, the
+        priority of the command whose alias is being executed is
+        used, SCRIPT otherwise.
+
+        """
         self.factory.session.log_command(text)
-        # Break in chunks based on the command stacking, if active
-        settings = self.factory.engine.settings
-        stacking = settings["options.input.command_stacking"]
-        encoding = settings["options.general.encoding"]
-        chunks = [text]
-        if stacking:
-            delimiter = re.escape(stacking)
-            re_stacking = u"(?<!{s}){s}(?!{s})".format(s=delimiter)
-            re_del = re.compile(re_stacking, re.UNICODE)
-            chunks = re_del.split(text)
-
-            # Reset ;; as ; (or other command stacking character)
-            def reset_del(match):
-                return match.group(0)[1:]
-
-            for i, chunk in enumerate(chunks):
-                chunks[i] = re.sub(delimiter + "{2,}", reset_del, chunk)
-
-        with self.factory.world.lock:
-            for text in chunks:
-                # Test the aliases
-                if alias:
-                    for alias in self.factory.world.aliases:
-                        alias.sharp_engine = self.factory.sharp_engine
-                        if alias.test(text):
-                            return
-
-                if not text.endswith("\r\n"):
-                    text += "\r\n"
-
-                self.transport.write(text.encode(encoding, errors="replace"))
+        if priority is None:
+            priority = self.pipeline.current_priority
+
+        self.pipeline.send(text, alias=alias, priority=priority)
 
     def test_macros(self, key, modifiers):
-        """Test the macros of this world."""
-        found = False
-        with self.factory.world.lock:
-            for macro in self.factory.world.macros:
-                code = (macro.key, macro.modifiers)
-                macro.sharp_engine = self.factory.sharp_engine
-                if code == (key, modifiers):
-                    macro.execute(self.factory.engine, self)
-                    found = True
-                    break
-
-        return found
+        """Test the macros of this world.
+
+        The world's lock is only held if a macro matches the key.
+
+        """
+        world = self.factory.world
+        macro = world.macro_index.get((key, modifiers))
+        if macro is None:
+            return False
+
+        with world.lock:
+            macro.sharp_engine = self.factory.sharp_engine
+            macro.execute(self.factory.engine, self)
+
+        return True
 
 
 class CocoFactory(ReconnectingClientFactory):
@@ -258,9 +258,18 @@ class Settings(Configuration):
             [input]
                 command_stacking = string(default=";")
                 auto_send_paste = boolean(default=True)
+                speedwalk = string(default="")
+                send_rate = integer(default=0, min=0)
+                send_burst = integer(default=10, min=1)
 
             [output]
                 richtext = boolean(default=True)
+                trigger_worker = boolean(default=False)
+                scrollback = integer(default=0, min=0)
+
+            [scripts]
+                max_paused = integer(default=100, min=1)
+                max_steps = integer(default=1000, min=1)
 
             [logging]
                 automatic = boolean(default=True)
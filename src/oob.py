@@ -0,0 +1,218 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""This file contains the out-of-band protocols (GMCP and MSDP).
+
+Some servers send structured data next to the text, in Telnet
+subnegotiations:  GMCP sends JSON messages grouped in packages
+(like 'Char.Vitals'), MSDP sends variables in a binary format.
+This module parses both of them.  The received data is kept in an
+'OOBState' tree, owned by the session, so scripts can read the
+game state without parsing the text sent by the server.
+
+"""
+
+import json
+
+# Constants
+GMCP = bytes([201])
+MSDP = bytes([69])
+MSDP_VAR = bytes([1])
+MSDP_VAL = bytes([2])
+MSDP_TABLE_OPEN = bytes([3])
+MSDP_TABLE_CLOSE = bytes([4])
+MSDP_ARRAY_OPEN = bytes([5])
+MSDP_ARRAY_CLOSE = bytes([6])
+GMCP_SUPPORTS = ["Core 1", "Char 1", "Char.Vitals 1", "Room 1",
+        "Comm.Channel 1"]
+
+class OOBState:
+
+    """The state tree of the out-of-band data.
+
+    Each package is stored in a tree of dictionaries:  a GMCP message
+    'Char.Vitals {"hp": 10}' is stored in state["Char"]["Vitals"].
+    When a dictionary is received, it is merged with the previous
+    one, since servers often send only the keys that changed.  MSDP
+    variables are stored in the 'MSDP' package.
+
+    """
+
+    def __init__(self):
+        self.tree = {}
+
+    def __repr__(self):
+        return "<OOBState {}>".format(repr(self.tree))
+
+    def get(self, package, default=None):
+        """Return the value of a package, or default if not set."""
+        node = self.tree
+        for name in package.split("."):
+            if not isinstance(node, dict) or name not in node:
+                return default
+
+            node = node[name]
+
+        return node
+
+    def update(self, package, value):
+        """Update a package and return its new value."""
+        names = package.split(".")
+        node = self.tree
+        for name in names[:-1]:
+            child = node.get(name)
+            if not isinstance(child, dict):
+                child = node[name] = {}
+            node = child
+
+        name = names[-1]
+        previous = node.get(name)
+        if isinstance(previous, dict) and isinstance(value, dict):
+            previous.update(value)
+            value = previous
+        node[name] = value
+        return value
+
+    def clear(self):
+        """Remove all the data, when the connection is lost."""
+        self.tree.clear()
+
+
+def parse_GMCP(data):
+    """Parse a GMCP message (bytes) and return (package, value).
+
+    The value is None if the message doesn't contain any.  A
+    ValueError is raised if the JSON value can't be read.
+
+    """
+    message = data.decode("utf-8", errors="replace")
+    package, _, value = message.partition(" ")
+    value = value.strip()
+    value = json.loads(value) if value else None
+    return package.strip(), value
+
+def encode_GMCP(package, value=None):
+    """Return the bytes of a GMCP message."""
+    message = package
+    if value is not None:
+        message += " " + json.dumps(value)
+
+    return message.encode("utf-8")
+
+def parse_MSDP(data):
+    """Parse MSDP data (bytes) and return a dictionary of variables.
+
+    Arrays are converted to lists and tables to dictionaries.  When
+    a variable has several values (without an array), the values
+    are returned in a list.
+
+    """
+    variables, _ = _parse_MSDP_table(data, 0, None)
+    return variables
+
+def _parse_MSDP_table(data, i, end):
+    """Parse MSDP variables until the end byte, return (dict, index)."""
+    variables = {}
+    name = None
+    while i < len(data):
+        byte = data[i:i + 1]
+        if byte == end:
+            return variables, i + 1
+        elif byte == MSDP_VAR:
+            name, i = _read_MSDP_word(data, i + 1)
+        elif byte == MSDP_VAL:
+            value, i = _parse_MSDP_value(data, i + 1)
+            if name is None:
+                continue
+
+            if name in variables:
+                previous = variables[name]
+                if not isinstance(previous, list):
+                    previous = variables[name] = [previous]
+                previous.append(value)
+            else:
+                variables[name] = value
+        else:
+            i += 1
+
+    return variables, i
+
+def _parse_MSDP_value(data, i):
+    """Parse one MSDP value, return (value, index)."""
+    byte = data[i:i + 1]
+    if byte == MSDP_TABLE_OPEN:
+        return _parse_MSDP_table(data, i + 1, MSDP_TABLE_CLOSE)
+    elif byte == MSDP_ARRAY_OPEN:
+        values = []
+        i += 1
+        while i < len(data):
+            byte = data[i:i + 1]
+            if byte == MSDP_ARRAY_CLOSE:
+                return values, i + 1
+            elif byte == MSDP_VAL:
+                value, i = _parse_MSDP_value(data, i + 1)
+                values.append(value)
+            else:
+                i += 1
+
+        return values, i
+
+    return _read_MSDP_word(data, i)
+
+def _read_MSDP_word(data, i):
+    """Read a string until the next MSDP byte, return (str, index)."""
+    start = i
+    while i < len(data) and data[i] > 6:
+        i += 1
+
+    return data[start:i].decode("utf-8", errors="replace"), i
+
+def encode_MSDP(variables):
+    """Return the bytes of MSDP variables (a dictionary).
+
+    The values can be str, lists or dictionaries.
+
+    """
+    data = b""
+    for name, value in variables.items():
+        data += MSDP_VAR + str(name).encode("utf-8") + _encode_MSDP_value(
+                value)
+
+    return data
+
+def _encode_MSDP_value(value):
+    """Return the bytes of one MSDP value, including MSDP_VAL."""
+    if isinstance(value, dict):
+        return MSDP_VAL + MSDP_TABLE_OPEN + encode_MSDP(value) + \
+                MSDP_TABLE_CLOSE
+    elif isinstance(value, (list, tuple)):
+        return MSDP_VAL + MSDP_ARRAY_OPEN + b"".join(
+                _encode_MSDP_value(item) for item in value) + \
+                MSDP_ARRAY_CLOSE
+
+    return MSDP_VAL + str(value).encode("utf-8")
@@ -0,0 +1,404 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""This file contains the outbound pipeline of commands.
+
+The text entered by the user (or sent by scripts) goes through
+several stages before being written to the server:
+
+1. split:  the text is split in commands, using the command
+   stacking delimiter, if set;
+2. alias:  the commands are tested against the world's aliases,
+   matching commands are replaced by the alias' action;
+3. speedwalk:  the remaining commands starting with the speedwalk
+   prefix are expanded in directions;
+4. encode:  the remaining commands are encoded;
+5. write:  the encoded commands are placed in the send queue, which
+   writes them to the server, at once if possible.
+
+The send queue is throttled by a token bucket:  no more than
+'options.input.send_burst' commands are written at once, and
+no more than 'options.input.send_rate' commands are written per
+second after that (0 to disable throttling).  Commands entered
+by the user (priority USER) are written before the commands
+sent by scripts (priority SCRIPT).
+
+A speedwalk is a command made of directions (n, s, e, w, u and d),
+optionally preceded by a number of times, after the speedwalk
+prefix ('options.input.speedwalk', empty to disable).  With '.'
+as prefix, '.3n2e' is sent as 'n', 'n', 'n', 'e', 'e'.  The
+command stacking delimiter can separate speedwalks from other
+commands, like '.3n;open door;.2e'.  Like aliases, speedwalks
+aren't expanded in raw text (sent with '#send', for instance).
+
+If profiling is enabled in the SharpScript engine (see
+'sharp.profiler'), the time spent in each stage is recorded.
+
+"""
+
+from collections import deque
+from functools import lru_cache
+import re
+from time import perf_counter
+
+from twisted.internet import reactor
+
+# Priorities of the send queue, the lowest first
+USER = 0
+SCRIPT = 1
+
+# Speedwalks
+MAX_SPEEDWALK = 100
+RE_SPEEDWALK = re.compile(r"(?:\d*[nsewud])+")
+RE_STEP = re.compile(r"(\d*)([nsewud])")
+
+class Splitter:
+
+    """Split a text in commands, using a command stacking delimiter.
+
+    The delimiter can be doubled to be sent as is:  with ';' as
+    delimiter, 'say 1;say 2' is split in two commands, but
+    'say 1;;2' is sent as 'say 1;2'.  Splitters are compiled once
+    per delimiter (see 'get_splitter').
+
+    """
+
+    def __init__(self, delimiter):
+        self.delimiter = delimiter
+        escaped = re.escape(delimiter)
+        self.re_split = re.compile("(?<!{s}){s}(?!{s})".format(s=escaped),
+                re.UNICODE)
+        self.re_double = re.compile(escaped + "{2,}")
+
+    def __repr__(self):
+        return "<Splitter {}>".format(repr(self.delimiter))
+
+    def split(self, text):
+        """Return the list of commands in the text."""
+        if self.delimiter not in text:
+            return [text]
+
+        re_double = self.re_double
+        return [re_double.sub(self.reset, chunk) if self.delimiter in chunk
+                else chunk for chunk in self.re_split.split(text)]
+
+    @staticmethod
+    def reset(match):
+        """Remove a delimiter in a doubled delimiter."""
+        return match.group(0)[1:]
+
+
+@lru_cache(maxsize=8)
+def get_splitter(delimiter):
+    """Return the splitter for this delimiter, or None."""
+    if not delimiter:
+        return None
+
+    return Splitter(delimiter)
+
+
+@lru_cache(maxsize=256)
+def expand_speedwalk(command, prefix):
+    """Return the directions of a speedwalk, or None.
+
+    None is returned if the command isn't a speedwalk, or if it
+    contains more than MAX_SPEEDWALK directions.
+
+    """
+    if not prefix or not command.startswith(prefix):
+        return None
+
+    walk = command[len(prefix):].lower()
+    if not RE_SPEEDWALK.fullmatch(walk):
+        return None
+
+    directions = []
+    for times, direction in RE_STEP.findall(walk):
+        times = int(times) if times else 1
+        if len(directions) + times > MAX_SPEEDWALK:
+            return None
+
+        directions.extend([direction] * times)
+
+    return tuple(directions)
+
+
+class OutboundPipeline:
+
+    """The outbound pipeline of a client.
+
+    The 'send' method sends text through the stages (see above).
+    All the commands of a text are placed in the send queue at once.
+    While an alias is executed, 'current_priority' holds the priority
+    of the command that matched it, so the commands sent by the
+    alias' action keep this priority.
+
+    """
+
+    def __init__(self, client, clock=None):
+        self.client = client
+        self.queue = SendQueue(client, clock)
+        self.current_priority = SCRIPT
+
+    def send(self, text, alias=True, priority=SCRIPT):
+        """Send the text to the server, through all the stages."""
+        client = self.client
+        factory = client.factory
+        settings = factory.engine.settings
+        profiler = factory.sharp_engine.profiler
+        timing = profiler.enabled
+        if timing:
+            start = perf_counter()
+
+        # Stage 1: split
+        splitter = get_splitter(settings["options.input.command_stacking"])
+        commands = splitter.split(text) if splitter else [text]
+        if timing:
+            now = perf_counter()
+            profiler.record("outbound", "split", now - start)
+            start = now
+
+        # Stage 2: alias
+        if alias:
+            commands = self.expand_aliases(commands, priority)
+            if timing:
+                now = perf_counter()
+                profiler.record("outbound", "alias", now - start)
+                start = now
+
+        if not commands:
+            return
+
+        # Stage 3: speedwalk
+        prefix = settings["options.input.speedwalk"] if alias else ""
+        if prefix:
+            commands = self.walk(commands, prefix)
+            if timing:
+                now = perf_counter()
+                profiler.record("outbound", "speedwalk", now - start)
+                start = now
+
+        # Stage 4: encode
+        data = self.encode(commands, settings["options.general.encoding"])
+        if timing:
+            now = perf_counter()
+            profiler.record("outbound", "encode", now - start)
+            start = now
+
+        # Stage 5: write
+        self.queue.configure(settings["options.input.send_rate"],
+                settings["options.input.send_burst"])
+        self.queue.push(data, priority)
+        if timing:
+            profiler.record("outbound", "write", perf_counter() - start)
+
+    def expand_aliases(self, commands, priority=SCRIPT):
+        """Return the commands that don't match any alias.
+
+        The first command matching an alias is replaced by the
+        alias' action.  The commands before it are written first,
+        the commands after it are dropped.
+
+        """
+        factory = self.client.factory
+        world = factory.world
+        sharp_engine = factory.sharp_engine
+        with world.lock:
+            alias_set = world.alias_set
+            alias_set.bind(sharp_engine)
+            for i, command in enumerate(commands):
+                alias = alias_set.find(command)
+                if alias is not None:
+                    break
+            else:
+                return commands
+
+        # Write the previous commands before executing the alias
+        previous = commands[:i]
+        if previous:
+            settings = factory.engine.settings
+            prefix = settings["options.input.speedwalk"]
+            if prefix:
+                previous = self.walk(previous, prefix)
+
+            self.queue.push(self.encode(previous,
+                    settings["options.general.encoding"]), priority)
+
+        previous_priority = self.current_priority
+        self.current_priority = priority
+        try:
+            with world.lock:
+                alias.test(command)
+        finally:
+            self.current_priority = previous_priority
+
+        return []
+
+    @staticmethod
+    def walk(commands, prefix):
+        """Return the commands with the speedwalks expanded."""
+        expanded = []
+        for command in commands:
+            directions = expand_speedwalk(command, prefix)
+            if directions is None:
+                expanded.append(command)
+            else:
+                expanded.extend(directions)
+
+        return expanded
+
+    @staticmethod
+    def encode(commands, encoding):
+        """Return the list of encoded commands."""
+        data = []
+        for command in commands:
+            if not command.endswith("\r\n"):
+                command += "\r\n"
+
+            data.append(command.encode(encoding, errors="replace"))
+
+        return data
+
+
+class SendQueue:
+
+    """The send queue of a client, throttled by a token bucket.
+
+    The bucket holds up to 'burst' tokens and is refilled with
+    'rate' tokens per second.  Writing a command consumes a token.
+    When the bucket is empty, the commands wait in their lane
+    (one lane per priority) until it is refilled.  With a rate
+    of 0, the commands are written as soon as they are pushed.
+
+    """
+
+    def __init__(self, client, clock=None):
+        self.client = client
+        self.clock = clock or reactor
+        self.lanes = (deque(), deque())
+        self.rate = 0
+        self.burst = 1
+        self.tokens = 0
+        self.last = self.clock.seconds()
+        self.timer = None
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes)
+
+    @property
+    def lengths(self):
+        """Return the number of waiting commands in each lane."""
+        return tuple(len(lane) for lane in self.lanes)
+
+    def configure(self, rate, burst):
+        """Change the rate and burst of the bucket."""
+        burst = max(burst, 1)
+        if (rate, burst) == (self.rate, self.burst):
+            return
+
+        self.refill()
+        if not self.rate:
+            self.tokens = burst
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = min(self.tokens, burst)
+
+    def refill(self):
+        """Add the tokens earned since the last refill."""
+        now = self.clock.seconds()
+        if self.rate:
+            self.tokens = min(self.burst,
+                    self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def push(self, data, priority=SCRIPT):
+        """Add encoded commands to the queue and write what can be."""
+        self.lanes[priority].extend(data)
+        if self.timer is None:
+            self.drain()
+
+    def drain(self):
+        """Write the commands allowed by the bucket."""
+        self.timer = None
+        if self.rate:
+            self.refill()
+            count = int(self.tokens)
+        else:
+            count = len(self)
+
+        data = []
+        for lane in self.lanes:
+            while lane and len(data) < count:
+                data.append(lane.popleft())
+
+        if self.rate:
+            self.tokens -= len(data)
+
+        if data:
+            self.write(data)
+
+        if self.rate and len(self):
+            delay = (1 - self.tokens) / self.rate
+            self.timer = self.clock.callLater(delay, self.drain)
+
+    def flush(self):
+        """Write all the waiting commands now, return their number."""
+        self.cancel()
+        data = []
+        for lane in self.lanes:
+            data.extend(lane)
+            lane.clear()
+
+        if data:
+            self.write(data)
+
+        return len(data)
+
+    def clear(self):
+        """Remove all the waiting commands, return their number."""
+        self.cancel()
+        cleared = len(self)
+        for lane in self.lanes:
+            lane.clear()
+
+        return cleared
+
+    def cancel(self):
+        """Cancel the pending drain, if any."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def write(self, data):
+        """Write the encoded commands to the server."""
+        transport = self.client.transport
+        if len(data) == 1:
+            transport.write(data[0])
+        else:
+            transport.writeSequence(data)
@@ -30,8 +30,10 @@
 
 import re
 from textwrap import dedent
+from time import perf_counter
 
 from log import logger
+from scripting.pattern import compile_pattern
 
 class Alias:
 
@@ -46,9 +48,11 @@ class Alias:
     def __init__(self, sharp, alias, action):
         self.sharp_engine = sharp
         self.alias = alias
-        self.re_alias = self.find_regex(alias)
         self.action = dedent(action.strip("\n"))
 
+        # Aliases of a disabled group aren't tested
+        self.group = ""
+
         # Set the alias's level
         self.level = sharp.engine.level
 
@@ -56,22 +60,72 @@ class Alias:
         return "<Alias for {} (level={})>".format(
                 repr(self.alias), self.level.name)
 
+    @property
+    def alias(self):
+        """Return the alias."""
+        return self._alias
+
+    @alias.setter
+    def alias(self, alias):
+        """Change the alias, its pattern will be compiled again."""
+        self._alias = alias
+        self._re_alias = None
+
+    @property
+    def re_alias(self):
+        """Return the compiled alias, compiling it if needed."""
+        if self._re_alias is None:
+            self._re_alias = self.find_regex(self._alias)
+
+        return self._re_alias
+
+    @property
+    def word(self):
+        """Return the literal word the commands must begin with.
+
+        An alias like "k *" or "go north" can only match commands
+        beginning with the word "k" or "go".  Regular expressions
+        (aliases beginning with '^') and aliases beginning with a
+        wildcard, a space or an incomplete word (like "s*") return
+        None.
+
+        """
+        alias = self._alias
+        if alias.startswith("^"):
+            return None
+
+        prefix = alias.split("*", 1)[0]
+        if not prefix or prefix[0].isspace():
+            return None
+
+        word = prefix.split(None, 1)[0]
+        if word == prefix and "*" in alias:
+            # The word could go on after the wildcard
+            return None
+
+        return word
+
     @property
     def sharp_script(self):
         """Return the SharpScript code to create this alias."""
-        return self.sharp_engine.format((("#alias", self.alias,
-                self.action), ))
+        arguments = ["#alias", self.alias, self.action]
+        if self.group:
+            arguments.append(self.group)
+
+        return self.sharp_engine.format((tuple(arguments), ))
 
     def find_regex(self, alias):
         """Find and compile the alias given as argument.
 
         If the alias begins with '^', the alias is already a
         regular expression that just needs to be compiled.  Otherwise,
-        some automatic actions will be performed on it.
+        some automatic actions will be performed on it.  Compiled
+        patterns are shared (see 'scripting.pattern').
 
         """
+        definition = "the alias {}".format(repr(alias))
         if alias.startswith("^"):
-            return re.compile(alias)
+            return compile_pattern(alias, definition=definition)
 
         alias = re.escape(alias)
 
@@ -79,17 +133,39 @@ class Alias:
         alias = alias.replace("\\*", "(.*?)")
         alias = "^" + alias + "$"
 
-        return re.compile(alias, re.IGNORECASE)
+        return compile_pattern(alias, re.IGNORECASE, definition)
 
     @property
     def copied(self):
         """Return a copied version of the alias."""
         copy = Alias(self.sharp_engine, self.alias, self.action)
+        copy.group = self.group
         copy.level = self.level
         return copy
 
     def test(self, command):
-        """Should the alias be triggered by the text?"""
+        """Should the alias be triggered by the text?
+
+        If profiling is enabled, the time spent testing the alias and
+        executing it is recorded.
+
+        """
+        profiler = self.sharp_engine.profiler
+        if profiler.enabled:
+            start = perf_counter()
+            matched = self.fire(command)
+            profiler.record("alias", self.alias, perf_counter() - start,
+                    matched)
+            return matched
+
+        return self.fire(command)
+
+    def fire(self, command):
+        """Execute the alias if it matches the command.
+
+        Return whether the alias matched.
+
+        """
         match = self.re_alias.search(command)
         if match:
             log = logger("client")
@@ -97,10 +173,8 @@ class Alias:
                     repr(self.alias)))
 
             engine = self.sharp_engine
-            if "args" not in engine.locals:
-                engine.locals["args"] = {}
-
-            args = engine.locals["args"]
+            # A new dictionary, scripts still running keep their own
+            args = engine.locals["args"] = {}
 
             # Copy the groups of this match
             i = 0
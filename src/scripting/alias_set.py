@@ -0,0 +1,123 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the AliasSet class, an indexed set of aliases.
+
+Most aliases begin with a literal word ("co", "k *", "go north").  A
+command can only match such an alias if its first word is the same.
+The AliasSet indexes the aliases by this word, so that only the
+aliases indexed by the command's first word, and the aliases that
+can't be indexed (beginning with a wildcard, a regular expression or
+an incomplete word like "s*"), are tested.
+
+"""
+
+from scripting.trigger_set import fold
+
+def first_word(command):
+    """Return the first word of the command, or None."""
+    if not command or command[0].isspace():
+        return None
+
+    return command.split(None, 1)[0]
+
+
+class AliasSet:
+
+    """An indexed set of aliases.
+
+    The set is built from a list of aliases (usually the world's
+    active aliases) and should be rebuilt when this list changes.
+    Its 'dispatch' method executes the same alias the client used
+    to select by testing every alias:  the first matching alias in
+    the list.
+
+    """
+
+    def __init__(self, aliases):
+        self.aliases = list(aliases)
+        self.index = {}
+        self.fallback = []
+        self.sharp_engine = None
+
+        for rank, alias in enumerate(self.aliases):
+            word = alias.word
+            if word is None:
+                self.fallback.append(rank)
+            else:
+                self.index.setdefault(fold(word), []).append(rank)
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def candidates(self, command):
+        """Return the aliases that could match the command, in order."""
+        ranks = self.fallback
+        word = first_word(command)
+        if word is not None:
+            indexed = self.index.get(fold(word))
+            if indexed:
+                ranks = sorted(ranks + indexed) if ranks else indexed
+
+        aliases = self.aliases
+        return [aliases[rank] for rank in ranks]
+
+    def bind(self, sharp_engine):
+        """Bind the aliases to a SharpScript engine.
+
+        This is done once, when the set is first used by a client.
+        The world's aliases are shared between sessions, so they
+        are bound again when another session uses the same set.
+
+        """
+        if sharp_engine is not self.sharp_engine:
+            for alias in self.aliases:
+                alias.sharp_engine = sharp_engine
+
+            self.sharp_engine = sharp_engine
+
+    def find(self, command):
+        """Return the first alias matching the command, or None."""
+        for alias in self.candidates(command):
+            if alias.re_alias.search(command):
+                return alias
+
+        return None
+
+    def dispatch(self, command, sharp_engine):
+        """Execute the first alias matching the command.
+
+        Return whether an alias has matched.
+
+        """
+        self.bind(sharp_engine)
+        alias = self.find(command)
+        if alias is None:
+            return False
+
+        return alias.test(command)
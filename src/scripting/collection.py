@@ -0,0 +1,134 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the Collection class, an indexed list.
+
+The world keeps its aliases, channels, events, macros and triggers
+in collections:  lists that also index their items by a key (the
+alias, the channel's name, the package, the shortcut or the
+reaction).  Checking whether an item with the same key already
+exists doesn't require to browse the list.
+
+"""
+
+class Collection(list):
+
+    """A list of items indexed by key.
+
+    The key of each item is computed by the 'key' function given to
+    the constructor.  The 'find' method returns the first item with
+    the given key, or None.  Appending an item updates the index
+    directly, other modifications rebuild it.  The optional
+    'on_change' function is called after every modification, except
+    when an item is appended and the optional 'on_append' function
+    is set:  'on_append' is then called with the item instead.
+
+    Items shouldn't be modified in a way that changes their key while
+    they are in the collection:  the index wouldn't be updated.
+
+    """
+
+    def __init__(self, key, items=(), on_change=None):
+        super().__init__(items)
+        self.key = key
+        self.index = {}
+        self.on_change = on_change
+        self.on_append = None
+        self.reindex()
+
+    def __repr__(self):
+        return "<Collection {}>".format(super().__repr__())
+
+    def reindex(self):
+        """Rebuild the index."""
+        key = self.key
+        index = self.index
+        index.clear()
+        for item in self:
+            index.setdefault(key(item), item)
+
+        self.changed()
+
+    def changed(self):
+        """Call the 'on_change' function, if any."""
+        if self.on_change:
+            self.on_change()
+
+    def find(self, key):
+        """Return the first item with this key, or None."""
+        return self.index.get(key)
+
+    def append(self, item):
+        super().append(item)
+        self.index.setdefault(self.key(item), item)
+        if self.on_append:
+            self.on_append(item)
+        else:
+            self.changed()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def insert(self, position, item):
+        super().insert(position, item)
+        self.reindex()
+
+    def remove(self, item):
+        super().remove(item)
+        self.reindex()
+
+    def pop(self, position=-1):
+        item = super().pop(position)
+        self.reindex()
+        return item
+
+    def clear(self):
+        super().clear()
+        self.index.clear()
+        self.changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.reindex()
+
+    def reverse(self):
+        super().reverse()
+        self.reindex()
+
+    def __setitem__(self, position, value):
+        super().__setitem__(position, value)
+        self.reindex()
+
+    def __delitem__(self, position):
+        super().__delitem__(position)
+        self.reindex()
@@ -0,0 +1,113 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Class containing the Event class."""
+
+from textwrap import dedent
+
+from log import sharp as logger
+
+class Event:
+
+    """An event object.
+
+    An event is a hook on the out-of-band data (GMCP or MSDP) sent
+    by the server.  It watches a package (like 'Char.Vitals') and
+    executes its action every time the package, or one of its
+    sub-packages, is updated.  This is often more reliable than
+    triggers reading the prompt.
+
+    """
+
+    def __init__(self, sharp, package, action):
+        self.sharp_engine = sharp
+        self.package = package
+        self.action = dedent(action.strip("\n"))
+        self.logger = logger
+
+        # Set the event's level
+        self.level = sharp.engine.level
+
+    def __repr__(self):
+        return "<Event for {} (level={})>".format(
+                repr(self.package), self.level.name)
+
+    @property
+    def sharp_script(self):
+        """Return the SharpScript code to create this event."""
+        return self.sharp_engine.format((("#event", self.package,
+                self.action), ))
+
+    @property
+    def copied(self):
+        """Return a copied version of the event."""
+        copy = Event(self.sharp_engine, self.package, self.action)
+        copy.level = self.level
+        return copy
+
+    @property
+    def world(self):
+        """Return the world bound to the SharpEngine."""
+        return self.sharp_engine and self.sharp_engine.world or None
+
+    def test(self, package):
+        """Should the event be fired by an update of this package?
+
+        The event watching 'Char' is fired when 'Char.Vitals' is
+        updated.  Package names ignore case.
+
+        """
+        package = package.lower()
+        watched = self.package.lower()
+        return package == watched or package.startswith(watched + ".")
+
+    def set_variables(self, package, value):
+        """Set the variables of the event in the SharpScript engine.
+
+        The updated package is in $1.  If the value is a dictionary,
+        each key becomes a variable (like '$hp' for 'Char.Vitals').
+        Otherwise, the value is in $2.
+
+        """
+        engine = self.sharp_engine
+        args = engine.locals["args"] = {}
+        args["1"] = package
+        if isinstance(value, dict):
+            for name, content in value.items():
+                engine.locals[str(name)] = content
+        else:
+            args["2"] = value
+
+    def execute(self, package, value):
+        """Execute the event for the updated package."""
+        world = self.world
+        world = world and world.name or "unknown"
+        self.logger.debug("Event {}.{} fired by {}.".format(
+                world, repr(self.package), repr(package)))
+        self.set_variables(package, value)
+        self.sharp_engine.execute(self.action, variables=True)
@@ -0,0 +1,82 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the process-wide cache of compiled patterns.
+
+Triggers and aliases compile their pattern when they are first
+tested.  Copies of the same trigger (in the dialogs, or in several
+sessions of the same world) share the same compiled pattern.  A
+pattern that can't be compiled is reported once, and replaced by a
+pattern that never matches.
+
+"""
+
+import re
+from threading import Lock
+
+from log import logger
+
+# Constants
+NEVER = re.compile(r"(?!)")
+
+# Compiled patterns, by (pattern, flags)
+_patterns = {}
+_lock = Lock()
+
+def compile_pattern(pattern, flags=0, definition=None):
+    """Return the compiled pattern, from the cache if possible.
+
+    If the pattern can't be compiled, the error is logged with the
+    definition using it (a trigger or an alias), and a pattern that
+    never matches is returned.
+
+    """
+    key = (pattern, flags)
+    compiled = _patterns.get(key)
+    if compiled is not None:
+        return compiled
+
+    with _lock:
+        compiled = _patterns.get(key)
+        if compiled is None:
+            try:
+                compiled = re.compile(pattern, flags)
+            except re.error as err:
+                log = logger("sharp")
+                log.warning("The pattern of {} can't be compiled: {}".format(
+                        definition or repr(pattern), err))
+                compiled = NEVER
+
+            _patterns[key] = compiled
+
+    return compiled
+
+def clear_patterns():
+    """Remove all compiled patterns from the cache."""
+    with _lock:
+        _patterns.clear()
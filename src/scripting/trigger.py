@@ -31,8 +31,10 @@
 
 import re
 from textwrap import dedent
+from time import perf_counter
 
 from log import sharp as logger
+from scripting.pattern import compile_pattern
 
 class Trigger:
 
@@ -48,13 +50,19 @@ class Trigger:
     def __init__(self, sharp, reaction, action, substitution=""):
         self.sharp_engine = sharp
         self.reaction = reaction
-        self.re_reaction = self.find_regex(reaction)
         self.action = dedent(action.strip("\n"))
         self.substitution = substitution
 
         # Flags
         self.mute = False
         self.mark = False
+        self.fallthrough = False
+
+        # Triggers of higher priority are tested first
+        self.priority = 0
+
+        # Triggers of a disabled group aren't tested
+        self.group = ""
         self.logger = logger
 
         # Set the trigger's level
@@ -64,17 +72,42 @@ class Trigger:
         return "<Trigger for {} (level={})>".format(
                 repr(self.reaction), self.level.name)
 
+    @property
+    def reaction(self):
+        """Return the reaction of the trigger."""
+        return self._reaction
+
+    @reaction.setter
+    def reaction(self, reaction):
+        """Change the reaction, its pattern will be compiled again."""
+        self._reaction = reaction
+        self._re_reaction = None
+
+    @property
+    def re_reaction(self):
+        """Return the compiled reaction, compiling it if needed."""
+        if self._re_reaction is None:
+            self._re_reaction = self.find_regex(self._reaction)
+
+        return self._re_reaction
+
     @property
     def sharp_script(self):
         """Return the SharpScript code to create this trigger."""
         arguments = ["#trigger", self.reaction, self.action]
-        if self.substitution:
+        if self.substitution or self.priority or self.group:
             arguments.append(self.substitution)
+        if self.priority or self.group:
+            arguments.append(str(self.priority))
+        if self.group:
+            arguments.append(self.group)
 
         if self.mute:
             arguments.append("+mute")
         if self.mark:
             arguments.append("+mark")
+        if self.fallthrough:
+            arguments.append("+fallthrough")
 
         statement = self.sharp_engine.format((tuple(arguments), ))
         return statement
@@ -86,6 +119,9 @@ class Trigger:
                 self.substitution)
         copy.mute = self.mute
         copy.mark = self.mark
+        copy.fallthrough = self.fallthrough
+        copy.priority = self.priority
+        copy.group = self.group
         copy.level = self.level
         return copy
 
@@ -94,16 +130,33 @@ class Trigger:
         """Return the world bound to the SharpEngine."""
         return self.sharp_engine and self.sharp_engine.world or None
 
+    @property
+    def literal(self):
+        """Return the longest literal text the reaction requires.
+
+        A reaction like "* tells you *" can only match a line
+        containing " tells you ".  Regular expressions (reactions
+        beginning with '^') and reactions without any literal part
+        return None.
+
+        """
+        if self.reaction.startswith("^"):
+            return None
+
+        return max(self.reaction.split("*"), key=len) or None
+
     def find_regex(self, reaction):
         """Find and compile the reaction given as argument.
 
         If the reaction begins with '^', the reaction is already a
         regular expression that just needs to be compiled.  Otherwise,
-        some automatic actions will be performed on it.
+        some automatic actions will be performed on it.  Compiled
+        patterns are shared (see 'scripting.pattern').
 
         """
+        definition = "the trigger {}".format(repr(reaction))
         if reaction.startswith("^"):
-            return re.compile(reaction)
+            return compile_pattern(reaction, definition=definition)
 
         reaction = re.escape(reaction)
 
@@ -111,7 +164,8 @@ class Trigger:
         reaction = reaction.replace("\\*", "(.*?)")
         reaction = "^" + reaction + "$"
 
-        return re.compile(reaction, re.IGNORECASE | re.UNICODE)
+        return compile_pattern(reaction, re.IGNORECASE | re.UNICODE,
+                definition)
 
     def set_variables(self, match):
         """Set the variables of the trigger in the SharpScript engine.
@@ -132,10 +186,8 @@ class Trigger:
 
         world = self.world
         engine = self.sharp_engine
-        if "args" not in engine.locals:
-            engine.locals["args"] = {}
-
-        args = engine.locals["args"]
+        # A new dictionary, scripts still running keep their own
+        args = engine.locals["args"] = {}
 
         # Copy the groups of this match
         i = 0
@@ -168,9 +220,19 @@ class Trigger:
         This function return either the matching expression or None.
         If the 'execute' argument is set to True, and the trigger
         should be fired, then call the 'execute' method.
+        If profiling is enabled, the time spent testing the reaction
+        is recorded.
 
         """
-        match = self.re_reaction.search(line)
+        profiler = self.sharp_engine.profiler
+        if profiler.enabled:
+            start = perf_counter()
+            match = self.re_reaction.search(line)
+            profiler.record("trigger", self.reaction,
+                    perf_counter() - start, match is not None)
+        else:
+            match = self.re_reaction.search(line)
+
         if match:
             world = self.world
             world = world and world.name or "unknown"
@@ -0,0 +1,195 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the TriggerSet class, a compiled set of triggers.
+
+Testing every trigger's regular expression on every line received
+from the server becomes expensive when a world defines hundreds of
+triggers.  Most of these triggers, however, require some literal text
+to be present in the line (a trigger like "* tells you *" cannot match
+a line that doesn't contain " tells you ").  The TriggerSet gathers
+these literal parts in an Aho-Corasick automaton, so that a line is
+scanned once to find the triggers that could match it.  Only these
+candidates have their regular expression tested.
+
+"""
+
+from log import logger
+
+# Constants
+# str.casefold handles most of the case-insensitive equivalences of
+# the 're' module, except for the Turkish dotted and dotless I
+FOLD_FIXES = str.maketrans("İı", "ii")
+
+def fold(text):
+    """Return the case-insensitive form of the text, to compare literals."""
+    return text.translate(FOLD_FIXES).casefold()
+
+
+class Automaton:
+
+    """An Aho-Corasick automaton to search several words at once.
+
+    Words are added with a value (any hashable object).  Once all
+    words have been added, the 'build' method must be called.  The
+    'search' method then returns the set of values whose word
+    appears in the text, scanning the text only once.
+
+    """
+
+    def __init__(self):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [set()]
+
+    def add(self, word, value):
+        """Add a word associated with a value."""
+        state = 0
+        for char in word:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions[state][char] = next_state
+                self.transitions.append({})
+                self.fail.append(0)
+                self.outputs.append(set())
+
+            state = next_state
+
+        self.outputs[state].add(value)
+
+    def build(self):
+        """Compute the failure links, browsing the states in width."""
+        queue = list(self.transitions[0].values())
+        for state in queue:
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+
+                fallback = self.transitions[fallback].get(char, 0)
+                if fallback == next_state:
+                    fallback = 0
+
+                self.fail[next_state] = fallback
+                self.outputs[next_state] |= self.outputs[fallback]
+
+    def search(self, text):
+        """Return the set of values whose word can be found in the text."""
+        transitions = self.transitions
+        fail = self.fail
+        outputs = self.outputs
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in transitions[state]:
+                state = fail[state]
+
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+
+        return found
+
+
+class TriggerSet:
+
+    """A compiled set of triggers.
+
+    The set is built from a list of triggers (usually the world's
+    triggers) and should be rebuilt when this list changes.  Triggers
+    are tested by decreasing priority, then by decreasing length of
+    their reaction, then in the order they were defined.  The first
+    matching trigger wins, unless it has the 'fallthrough' flag:  in
+    this case, the following triggers are tested as well (see
+    'matches').
+
+    """
+
+    def __init__(self, triggers):
+        self.triggers = list(triggers)
+        self.automaton = Automaton()
+        self.always = []
+
+        # Sort the triggers in evaluation order (the sort is stable)
+        self.order = sorted(self.triggers, key=lambda trigger: (
+                trigger.priority, len(trigger.reaction)), reverse=True)
+
+        for rank, trigger in enumerate(self.order):
+            literal = trigger.literal
+            if literal:
+                self.automaton.add(fold(literal), rank)
+            else:
+                self.always.append(rank)
+
+        self.automaton.build()
+
+    def __len__(self):
+        return len(self.triggers)
+
+    def candidates(self, line):
+        """Return the triggers that could match the line, in order."""
+        ranks = self.automaton.search(fold(line))
+        ranks.update(self.always)
+        order = self.order
+        return [order[rank] for rank in sorted(ranks)]
+
+    def match(self, line):
+        """Return the (trigger, match) tuple for the line, or None.
+
+        Only the triggers whose literal text appears in the line are
+        tested.  The first of them in evaluation order to match
+        is returned.
+
+        """
+        matches = self.matches(line)
+        return matches[0] if matches else None
+
+    def matches(self, line):
+        """Return the list of (trigger, match) tuples for the line.
+
+        The triggers are tested in evaluation order.  Testing stops
+        at the first matching trigger without the 'fallthrough' flag.
+
+        """
+        matches = []
+        for trigger in self.candidates(line):
+            try:
+                match = trigger.test(line)
+            except Exception:
+                log = logger("client")
+                log.exception("The trigger {} failed".format(
+                        repr(trigger.reaction)))
+            else:
+                if match:
+                    matches.append((trigger, match))
+                    if not trigger.fallthrough:
+                        break
+
+        return matches
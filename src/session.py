@@ -33,6 +33,7 @@ import os
 from pathlib import Path
 
 from log import client as log
+from oob import OOBState
 from sharp.engine import SharpScript
 
 class Session:
@@ -55,6 +56,7 @@ class Session:
         self.character = None
         self.engine = None
         self.should_log = False
+        self.oob = OOBState()
         self._sharp_engine = None
 
     def __repr__(self):
@@ -4,14 +4,19 @@ from sharp.function import Function
 from sharp.functions.alias import Alias
 from sharp.functions.channel import Channel
 from sharp.functions.checkvar import Checkvar
+from sharp.functions.event import Event
 from sharp.functions.feed import Feed
+from sharp.functions.group import Group
 from sharp.functions.idle import Idle
 from sharp.functions.macro import Macro
 from sharp.functions.pause import Pause
 from sharp.functions.play import Play
+from sharp.functions.profile import Profile
+from sharp.functions.queue import Queue
 from sharp.functions.randplay import RandPlay
 from sharp.functions.repeat import Repeat
 from sharp.functions.say import Say
+from sharp.functions.scripts import Scripts
 from sharp.functions.send import Send
 from sharp.functions.trigger import Trigger
 from sharp.functions.tts import TTS
@@ -21,14 +26,19 @@ FUNCTIONS = {
     "alias": Alias,
     "channel": Channel,
     "checkvar": Checkvar,
+    "event": Event,
     "feed": Feed,
+    "group": Group,
     "idle": Idle,
     "macro": Macro,
     "pause": Pause,
     "play": Play,
+    "profile": Profile,
+    "queue": Queue,
     "randplay": RandPlay,
     "repeat": Repeat,
     "say": Say,
+    "scripts": Scripts,
     "send": Send,
     "trigger": Trigger,
     "tts": TTS,
@@ -28,17 +28,25 @@
 
 """Module containing the SharpEngine class."""
 
+import builtins
+from collections import OrderedDict
+from logging import DEBUG
 import re
 from textwrap import dedent
-
-from twisted.internet import reactor
+from time import perf_counter
 
 from log import logger
 from sharp import FUNCTIONS
-from sharp.exceptions import ScriptInterrupt
+from sharp.exceptions import ScriptInterrupt, SharpSyntaxError
+from sharp.parser import Parser, PythonCode, find_right_brace
+from sharp.profiler import Profiler
+from sharp.scheduler import Scheduler, Task
+from sharp.scope import Scope
+from sharp.template import compile_template
 
 # Constants
-RE_VAR = re.compile(r"(?<!\\)\$\{?([A-Za-z0-9_]+)\}?")
+RE_SEMICOLONS = re.compile(r";;?")
+CACHE_SIZE = 256
 
 class SharpScript:
 
@@ -60,9 +68,15 @@ class SharpScript:
         self.world = world
         self.globals = dict(globals())
         self.locals = {}
+        self.scope = None
+        self.scheduler = Scheduler(self)
+        self.profiler = Profiler()
         self.to_del = set()
         self.to_set = {}
         self.functions = {}
+        self.compiled = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.logger = logger("sharp")
         self.logger.debug("Creating SharpScript #{}".format(self.id))
 
@@ -73,65 +87,216 @@ class SharpScript:
             self.functions[name] = function
             self.globals[name] = function.run
 
+        # Variables are replaced when the compiled code runs
+        self.globals["replace_variables"] = self.replace_variables
+        self.globals["vars"] = self.locals
+
     def bind_client(self, client):
         """Bind a client to the sharp engine."""
         self.client = client
         for function in self.functions.values():
             function.client = client
 
-    def execute(self, code, debug=False, variables=False, to_process=None):
-        """Execute the SharpScript code given as an argument."""
-        if code is None and to_process:
-            code = to_process
-
-        if isinstance(code, str):
-            instructions, to_process = self.feed(
-                code, variables=variables, first=True
-            )
-            instructions = "\n".join(instructions).splitlines()
-            pycode = "def script():\n    " + "\n    ".join(instructions) + "\n    yield None"
-            globals = self.globals
-            globals["vars"] = self.locals
-            locals = {}
-
-            if debug:
-                self.logger.debug("Executing SharpScript\n{}".format(
-                        pycode))
-            exec(pycode, globals, locals)
-            script = locals["script"]
-            code = script()
-
-        # code is a generator, consume it little by little
-        self.locals.update(self.to_set)
-        for name in self.to_del:
-            self.locals.pop(name, None)
-
-        self.to_del.clear()
-        self.to_set.clear()
-        code.gi_frame.f_locals.update(self.locals)
-        code.gi_frame.f_locals.update({"vars": self.locals})
+    def execute(self, code, debug=False, variables=False):
+        """Execute the SharpScript code given as an argument.
+
+        The code is compiled (see 'compile'), then each statement is
+        executed in turn (see 'run').  If profiling is enabled, the
+        time spent until the script ends or is paused is recorded.
+
+        Each script has its own scope (see 'sharp.scope'):  it reads
+        and writes the variables directly in 'self.locals', except
+        for 'args' (the groups of the trigger or alias that called
+        the script), which is kept in the scope.
+
+        """
+        to_process = iter(self.compile(code, debug=debug,
+                variables=variables))
+        scope = Scope(self.locals, self.locals.get("args", {}))
+        task = Task(code, to_process, scope, debug=debug,
+                variables=variables)
+        profiler = self.profiler
+        if profiler.enabled:
+            start = perf_counter()
+            self.run(task)
+            profiler.record("script", code, perf_counter() - start)
+        else:
+            self.run(task)
+
+    def run(self, task, limit=False):
+        """Run the task, until it ends or is paused.
 
+        When the task is paused, it is given to the scheduler (see
+        'sharp.scheduler'), which will resume it.  If 'limit' is
+        True, the steps executed are counted in the scheduler's
+        limit of steps per second.
+
+        """
+        scheduler = self.scheduler
+        while True:
+            if task.code is None:
+                script = next(task.to_process, None)
+                if script is None:
+                    return
+
+                task.code = script(task.scope)
+
+            if limit:
+                delay = scheduler.step()
+                if delay:
+                    scheduler.schedule(task, delay)
+                    return
+
+            # Commit the variables modified by '#writevar'
+            self.locals.update(self.to_set)
+            for name in self.to_del:
+                self.locals.pop(name, None)
+
+            self.to_del.clear()
+            self.to_set.clear()
+
+            # code is a generator, consume it little by little
+            previous = self.scope
+            self.scope = task.scope
+            try:
+                value = next(task.code)
+            except ScriptInterrupt:
+                return
+            except Exception:
+                import traceback
+                print(traceback.format_exc())
+                return
+            finally:
+                self.scope = previous
+
+            if value is None:
+                task.code = None
+            elif isinstance(value, (int, float)):
+                # Pause here, the scheduler will resume the task
+                scheduler.schedule(task, value)
+                return
+            else:
+                return
+
+    def resume(self, task):
+        """Resume a task paused by the scheduler."""
+        self.run(task, limit=True)
+
+    def warn(self, message):
+        """Display a warning to the user, if a client is connected."""
+        if self.client:
+            self.client.handle_message(message)
+
+    def compile(self, code, debug=False, variables=False):
+        """Compile the SharpScript code and return a tuple of functions.
+
+        Each statement is compiled to a function returning a
+        generator, to be executed in turn.  Python code at the top
+        of the script is executed with the first statement.  Each
+        function expects the script's scope as argument.  The
+        compiled functions are kept in a cache limited to CACHE_SIZE
+        entries, the least recently used being removed first.  When
+        'variables' is True, the variables are replaced when the
+        functions run, so the cached functions remain valid.  Cache
+        statistics are available through 'cache_info'.
+
+        """
+        key = (code, variables)
+        scripts = self.compiled.get(key)
+        if scripts is not None:
+            self.cache_hits += 1
+            self.compiled.move_to_end(key)
+            return scripts
+
+        self.cache_misses += 1
+        start = perf_counter()
+        nodes, _ = Parser(code).parse(python=True)
+        scripts = []
+        python = []
+        instructions = []
+        for node in nodes:
+            if isinstance(node, PythonCode):
+                # Python code is executed in the script's scope
+                python.append(self.compile_python(node))
+                instructions.append("scope.run(python[{}], " \
+                        "globals())".format(len(python) - 1))
+                continue
+
+            instructions.append(self.convert_to_python(node.as_tuple(),
+                    variables=variables, runtime=True))
+            scripts.append(self.compile_script(instructions, python, debug))
+            instructions = []
+
+        if instructions or not scripts:
+            scripts.append(self.compile_script(instructions, python, debug))
+
+        scripts = tuple(scripts)
+        if self.profiler.enabled:
+            self.profiler.record("compile", code, perf_counter() - start)
+
+        self.compiled[key] = scripts
+        if len(self.compiled) > CACHE_SIZE:
+            self.compiled.popitem(last=False)
+
+        return scripts
+
+    def compile_python(self, node):
+        """Compile a block of Python code.
+
+        The block is executed outside of the script's generator, so
+        it can't use 'return' or 'yield' (to pause the script, use
+        '#pause' after the block).
+
+        """
         try:
-            value = next(code)
-        except ScriptInterrupt:
-            return
-        except Exception:
-            import traceback
-            print(traceback.format_exc())
-
-        self.locals.update(code.gi_frame.f_locals)
-        self.locals.pop("vars", None)
-
-        if value is None:
-            if to_process and to_process.strip():
-                self.execute(None, debug, variables, to_process)
-        elif isinstance(value, (int, float)):
-            # Pause here, create a task
-            reactor.callLater(
-                value, self.execute, code, debug, variables, to_process
-            )
-
-    def feed(self, content, variables=False, first=False):
+            return builtins.compile(node.code, "<SharpScript>", "exec")
+        except SyntaxError as err:
+            if "outside function" in str(err.msg):
+                raise SharpSyntaxError("the Python code at line {} " \
+                        "can't use 'return' or 'yield', use '#pause' " \
+                        "to pause the script".format(node.line)) from err
+
+            raise
+
+    def compile_script(self, instructions, python, debug=False):
+        """Return a function creating a generator from Python instructions."""
+        instructions = "\n".join(instructions).splitlines()
+        pycode = "def script(scope, python=python):\n    " + \
+                "\n    ".join(instructions) + "\n    yield None"
+        if debug:
+            self.logger.debug("Compiling SharpScript\n{}".format(pycode))
+
+        locals = {"python": python}
+        exec(pycode, self.globals, locals)
+        return locals["script"]
+
+    def set_profiling(self, enabled):
+        """Enable or disable profiling (see 'sharp.profiler').
+
+        When profiling is enabled, the functions called by the
+        compiled code are wrapped to record their calls.  The
+        original functions are restored when profiling is disabled.
+
+        """
+        profiler = self.profiler
+        profiler.enabled = enabled
+        for name, function in self.functions.items():
+            if enabled:
+                self.globals[name] = profiler.wrap("function", name,
+                        function.run)
+            else:
+                self.globals[name] = function.run
+
+    def cache_info(self):
+        """Return a dictionary of statistics on the compiled code cache."""
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self.compiled),
+            "maxsize": CACHE_SIZE,
+        }
+
+    def feed(self, content, variables=False, first=False, runtime=False):
         """Feed the SharpScript engine with a string content.
 
         The content is probably a file with several statements in
@@ -140,36 +305,30 @@ class SharpScript:
         this suite of statements.
 
         """
-        # Execute Python code if necessary
+        nodes, rest = Parser(content).parse(first=first, python=True)
         codes = []
-        while content.startswith("{+"):
-            end = self.find_right_brace(content)
-            code = content[2:end - 1].lstrip("\n").rstrip("\n ")
-            code = dedent(code)
-            codes.append(code)
-            content = content[end + 1:]
-
-        # The remaining must be SharpScript, splits into statements
-        statements, rest = self.split_statements(content, first=first)
-        for statement in statements:
-            pycode = self.convert_to_python(statement, variables=variables)
-            codes.append(pycode)
-
-            if first:
-                return codes, rest
+        for node in nodes:
+            if isinstance(node, PythonCode):
+                codes.append(node.code)
+            else:
+                codes.append(self.convert_to_python(node.as_tuple(),
+                        variables=variables, runtime=runtime))
 
         if first:
-            return codes, content
+            return codes, rest
 
         return codes
 
-    def convert_to_python(self, statement, variables=False):
+    def convert_to_python(self, statement, variables=False, runtime=False):
         """Convert the statement to Python and return the str code.
 
         The statement given in argument should be a tuple:  The first
         argument of the tuple should be a function (like '#play' or
         '#send').  The remaining arguments should be put in a string,
-        except for other Sharp or Python code.
+        except for other Sharp or Python code.  If 'variables' is
+        True, the variables are replaced in the arguments, unless
+        'runtime' is True:  in this case, the generated code replaces
+        them when it's executed.
 
         """
         function_name = statement[0][1:].lower()
@@ -181,19 +340,26 @@ class SharpScript:
             elif argument.startswith("{"):
                 argument = argument[1:-1]
                 argument = self.replace_semicolons(argument)
-                if variables:
-                    argument = self.replace_variables(argument)
+                if variables and runtime and "$" in argument:
+                    argument = "replace_variables(" + repr(argument) + ")"
+                else:
+                    if variables:
+                        argument = self.replace_variables(argument)
 
-                argument = repr(argument)
+                    argument = repr(argument)
             elif argument[0] in "-+":
                 kwargs[argument[1:]] = True if argument[0] == "+" else False
                 continue
             else:
                 argument = self.replace_semicolons(argument)
-                if variables:
-                    argument = self.replace_variables(argument)
+                if variables and runtime and "$" in argument:
+                    argument = "replace_variables(" + repr(argument).replace(
+                            "\\n", "\n") + ")"
+                else:
+                    if variables:
+                        argument = self.replace_variables(argument)
 
-                argument = repr(argument).replace("\\n", "\n")
+                    argument = repr(argument).replace("\\n", "\n")
 
             arguments.append(argument)
 
@@ -215,77 +381,13 @@ class SharpScript:
         """Split the given string content into different statements.
 
         A statement is one-line short at the very least.  It can be
-        longer by that, if it's enclosed into braces.
+        longer by that, if it's enclosed into braces.  This method
+        returns a tuple (statements, remaining) in which statements
+        is a list of tuples (function, argument1, argument2, ...).
 
         """
-        statements = []
-        i = 0
-        function_name = ""
-        arguments = []
-        while True:
-            remaining = content[i:]
-
-            # If remaining is empty, saves the statement and exits the loop
-            if not remaining or remaining.isspace():
-                if function_name:
-                    statements.append((function_name, ) + tuple(arguments))
-
-                break
-
-            # If remaining begins with a new line
-            if remaining[0] == "\n":
-                if function_name:
-                    statements.append((function_name, ) + tuple(arguments))
-
-                    if first:
-                        break
-
-                    function_name = ""
-                    arguments = []
-
-                i += 1
-                continue
-
-            # If remaining begins with a space
-            if remaining[0].isspace():
-                remaining = remaining[1:]
-                i += 1
-                continue
-
-            # If the function_name is not defined, take the first parameter
-            if not function_name:
-                if remaining.startswith("#") and not remaining.startswith(
-                        "##"):
-                    # This is obviously a function name
-                    function_name = remaining.splitlines()[0].split(" ")[0]
-                    arguments = []
-                    i += len(function_name)
-                else:
-                    function_name = "#send"
-                    argument = remaining.splitlines()[0]
-                    i += len(argument)
-
-                    if argument.startswith("##"):
-                        argument = argument[1:]
-
-                    arguments = [argument]
-            elif remaining[0] == "{":
-                end = self.find_right_brace(remaining)
-                argument = remaining[:end + 1]
-                i += end + 1
-                if argument.startswith("##"):
-                    argument = argument[1:]
-
-                arguments.append(argument)
-            else:
-                argument = remaining.splitlines()[0].split(" ")[0]
-                i += len(argument)
-                if argument.startswith("##"):
-                    argument = argument[1:]
-
-                arguments.append(argument)
-
-        return statements, remaining
+        statements, rest = Parser(content).parse(first=first)
+        return [statement.as_tuple() for statement in statements], rest
 
     def find_right_brace(self, text):
         """Find the right brace matching the opening one.
@@ -297,36 +399,13 @@ class SharpScript:
             33
 
         """
-        level = 0
-        i = 0
-        while i < len(text):
-            char = text[i]
-            if char == "{":
-                level += 1
-            elif char == "}":
-                level -= 1
-
-            if level == 0:
-                return i
-
-            i += 1
-
-        return None
+        return find_right_brace(text)
 
     @staticmethod
     def replace_semicolons(text):
         """Replace all not-escaped semi-colons."""
-        i = 0
-        while i < len(text):
-            remaining = text[i:]
-            if remaining.startswith(";;"):
-                i += 2
-                continue
-            elif remaining.startswith(";"):
-                text = text[:i] + "\n" + text[i + 1:]
-            i += 1
-
-        return text.replace(";;", ";")
+        return RE_SEMICOLONS.sub(lambda match: "\n" if match.group() == ";" \
+                else ";", text)
 
     def replace_variables(self, line):
         """Replace the variables in the line (str) and return the new line.
@@ -335,36 +414,27 @@ class SharpScript:
             $variable (when surrounded by special characters)
             ${variable} (if not).
 
-        The dollar sign can be espaced with \$.
+        The dollar sign can be espaced with \\$.
 
         For instance:
             "You see your heal point is now $pv."
             "You have ${pv}PV left."
             "You can earn ${sum}USD if you move quickly."
-            "You can earn \$$sum if you move quickly."
-
-        """
-        def spot(match):
-            """A variable has been found and should be replaced."""
-            variable = match.group(1)
-            args = self.locals.get("args", {})
-            if variable.isdigit():
-                # Get from the 'args' variable
-                value = args.get(variable, "")
-            else:
-                value = self.locals.get(variable, "")
+            "You can earn \\$$sum if you move quickly."
 
-            self.logger.debug("#{} requests variable {}, value={}".format(
-                    self.id, repr(variable), repr(value)))
-            return str(value)
+        The line is compiled into a template once (see 'sharp.template').
+        The variables are read in the scope of the running script, if any.
 
-        # Replace the variables
-        line = RE_VAR.sub(spot, line)
-
-        # Escape the double $ sign
-        line = line.replace("\\$", "$")
-
-        return line
+        """
+        template = compile_template(line)
+        variables = self.scope if self.scope is not None else self.locals
+        if self.logger.isEnabledFor(DEBUG):
+            for is_arg, variable in template.variables:
+                value = template.lookup(variables, is_arg, variable)
+                self.logger.debug("#{} requests variable {}, value={}".format(
+                        self.id, repr(variable), repr(value)))
+
+        return template.render(variables)
 
     def format(self, content, return_str=True):
         """Write SharpScript and return a string.
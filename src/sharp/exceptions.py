@@ -34,3 +34,10 @@ class ScriptInterrupt(RuntimeError):
     """Exception raised when the script should terminate."""
 
     pass
+
+
+class SharpSyntaxError(ValueError):
+
+    """Exception raised when the SharpScript code can't be parsed."""
+
+    pass
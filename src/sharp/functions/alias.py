@@ -35,8 +35,9 @@ class Alias(Function):
 
     """Function SharpScript 'alias'."""
 
-    def run(self, alias, action):
+    def run(self, alias, action, group=""):
         """Create an alias."""
         alias = ObjAlias(self.sharp_engine, alias, action)
+        alias.group = group
         if self.world:
             self.world.add_alias(alias)
@@ -45,7 +45,7 @@ class Channel(Function):
     def run(self, name, show=True):
         """Create a channel."""
         if self.world:
-            if name not in [ch.name for ch in self.world.channels]:
+            if self.world.channels.find(name) is None:
                 channel = ObjChannel(self.world, name)
                 self.world.add_channel(channel)
             else:
@@ -41,10 +41,9 @@ class Feed(Function):
     def run(self, channel, message):
         """Feed a channel."""
         if self.world:
-            for t_channel in self.world.channels:
-                if t_channel.name == channel:
-                    t_channel.feed(message)
-                    return
+            t_channel = self.world.channels.find(channel)
+            if t_channel is not None:
+                t_channel.feed(message)
 
     def display(self, dialog, channel="", message=""):
         """Display the function's argument."""
@@ -76,35 +76,53 @@ class Pause(Function):
 
         return (pause, )
 
+    def run(self, pause):
+        """Return the time to pause in seconds.
+
+        This function is called by the compiled code when the time
+        can't be computed beforehand:  it contains variables, or is a
+        range ('1..3') in which a time is picked at random every
+        time the script runs.
+
+        """
+        pause = str(pause)
+        if ".." in pause:
+            min_pause, max_pause = pause.split("..", 1)
+        else:
+            min_pause = max_pause = pause
+
+        try:
+            m_pause = float(min_pause)
+        except ValueError:
+            m_pause = 0
+
+        try:
+            x_pause = float(max_pause)
+        except ValueError:
+            x_pause = 0
+
+        m_pause = m_pause if m_pause > 0 else 0
+        x_pause = x_pause if x_pause > 0 else 0
+
+        if m_pause != x_pause:
+            return uniform(m_pause, x_pause)
+
+        return m_pause
+
     def custom_code(self, pause=0):
         """Pause the script."""
         if isinstance(pause, str):
             if pause.startswith("'") and pause.endswith("'"):
                 pause = pause[1:-1]
-            if pause.startswith('"') and pause.endswith('"'):
+            elif pause.startswith('"') and pause.endswith('"'):
                 pause = pause[1:-1]
-
-            if ".." in pause:
-                min_pause, max_pause = pause.split("..", 1)
             else:
-                min_pause = max_pause = pause
+                # The time is an expression (it contains variables)
+                return f"yield pause({pause})"
 
-            try:
-                m_pause = float(min_pause)
-            except ValueError:
-                m_pause = 0
-
-            try:
-                x_pause = float(max_pause)
-            except ValueError:
-                x_pause = 0
-
-            m_pause = m_pause if m_pause > 0 else 0
-            x_pause = x_pause if x_pause > 0 else 0
+            if ".." in pause:
+                return f"yield pause({pause!r})"
 
-            if m_pause != x_pause:
-                pause = uniform(m_pause, x_pause)
-            else:
-                pause = m_pause
+            pause = self.run(pause)
 
         return f"yield {pause}"
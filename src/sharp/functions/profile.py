@@ -0,0 +1,87 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the Profile function class."""
+
+from sharp import Function
+
+class Profile(Function):
+
+    """Function SharpScript '#profile'.
+
+    This function controls the profiling of scripts, triggers,
+    aliases and functions.  It has different syntax:
+
+    Start profiling:
+        #profile on
+    Stop profiling:
+        #profile off
+    Display the 10 slowest scripts, triggers, aliases or functions:
+        #profile
+    Display the 20 slowest:
+        #profile show 20
+    Remove the statistics:
+        #profile reset
+
+    """
+
+    description = "Profile scripts, triggers and aliases"
+
+    def run(self, action="show", count="10"):
+        """Control profiling."""
+        if not self.client or not self.sharp_engine:
+            return
+
+        sharp = self.sharp_engine
+        action = action.lower()
+        if action in ("on", "off"):
+            sharp.set_profiling(action == "on")
+            if action == "on":
+                message = self.t("on", "Profiling enabled.")
+            else:
+                message = self.t("off", "Profiling disabled.")
+        elif action == "reset":
+            sharp.profiler.reset()
+            message = self.t("reset", "Profiling statistics removed.")
+        elif action == "show":
+            try:
+                count = int(count)
+            except ValueError:
+                count = 10
+
+            lines = sharp.profiler.report(count)
+            if lines:
+                message = "\n".join(lines)
+            else:
+                message = self.t("empty", "No profiling statistics.")
+        else:
+            message = self.t("invalid_action", "Invalid action: " \
+                    "{action}.  Use on, off, show or reset.").format(
+                    action=action)
+
+        self.client.handle_message(message)
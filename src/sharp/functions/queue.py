@@ -0,0 +1,75 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""Module containing the Queue function class."""
+
+from sharp import Function
+
+class Queue(Function):
+
+    """Function SharpScript '#queue'.
+
+    This function reports, flushes or clears the send queue (the
+    commands waiting to be sent because of the send rate).  It
+    has different syntax:
+
+    Display the number of waiting commands:
+        #queue
+    Send all the waiting commands now:
+        #queue flush
+    Remove all the waiting commands:
+        #queue clear
+
+    """
+
+    description = "Report, flush or clear the send queue"
+
+    def run(self, action="show"):
+        """Report, flush or clear the send queue."""
+        if not self.client:
+            return
+
+        queue = self.client.pipeline.queue
+        action = action.lower()
+        if action == "flush":
+            flushed = queue.flush()
+            self.client.handle_message(self.t("flushed",
+                    "{flushed} command(s) sent.").format(flushed=flushed))
+        elif action == "clear":
+            cleared = queue.clear()
+            self.client.handle_message(self.t("cleared",
+                    "{cleared} command(s) removed.").format(cleared=cleared))
+        elif action == "show":
+            user, script = queue.lengths
+            self.client.handle_message(self.t("length",
+                    "{length} command(s) waiting ({user} from the input, "
+                    "{script} from scripts).").format(length=user + script,
+                    user=user, script=script))
+        else:
+            self.client.handle_message(self.t("invalid_action",
+                    "Invalid action: {action}.  Use show, flush or " \
+                    "clear.").format(action=action))
@@ -0,0 +1,91 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the Scripts function class."""
+
+from sharp import Function
+
+class Scripts(Function):
+
+    """Function SharpScript '#scripts'.
+
+    This function lists or stops the paused scripts.  It has
+    different syntax:
+
+    List the paused scripts:
+        #scripts
+    Stop the paused script number 3:
+        #scripts kill 3
+    Stop all paused scripts:
+        #scripts kill
+
+    """
+
+    description = "List or stop the paused scripts"
+
+    def run(self, action="list", id=""):
+        """List or stop the paused scripts."""
+        if not self.client or not self.sharp_engine:
+            return
+
+        scheduler = self.sharp_engine.scheduler
+        action = action.lower()
+        if action == "kill":
+            if id:
+                try:
+                    id = int(id.lstrip("#"))
+                except ValueError:
+                    self.client.handle_message(self.t("invalid_id",
+                            "Invalid script number: {id}.").format(id=id))
+                    return
+            else:
+                id = None
+
+            killed = scheduler.kill(id)
+            self.client.handle_message(self.t("killed",
+                    "{killed} script(s) stopped.").format(killed=killed))
+        elif action == "list":
+            tasks = scheduler.list()
+            if not tasks:
+                self.client.handle_message(self.t("no_script",
+                        "No paused script."))
+                return
+
+            now = scheduler.clock.seconds()
+            lines = []
+            for task in tasks:
+                lines.append(self.t("task",
+                        "#{id} (in {delay:.1f}s): {summary}").format(
+                        id=task.id, delay=max(task.due - now, 0),
+                        summary=task.summary))
+
+            self.client.handle_message("\n".join(lines))
+        else:
+            self.client.handle_message(self.t("invalid_action",
+                    "Invalid action: {action}.  Use list or kill.").format(
+                    action=action))
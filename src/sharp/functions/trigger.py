@@ -35,12 +35,18 @@ class Trigger(Function):
 
     """Function SharpScript 'trigger'."""
 
-    def run(self, reaction, action, substitution="", mute=False,
-            mark=False):
-        """Say the text."""
+    def run(self, reaction, action, substitution="", priority=0, group="",
+            mute=False, mark=False, fallthrough=False):
+        """Create a trigger."""
         trigger = ObjTrigger(self.sharp_engine, reaction, action,
                 substitution)
         trigger.mute = mute
         trigger.mark = mark
+        trigger.fallthrough = fallthrough
+        trigger.group = group
+        try:
+            trigger.priority = int(priority)
+        except ValueError:
+            trigger.priority = 0
         if self.world:
             self.world.add_trigger(trigger)
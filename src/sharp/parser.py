@@ -0,0 +1,265 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the SharpScript parser.
+
+The parser reads SharpScript in a single pass and returns a list of
+nodes (an abstract syntax tree), each node knowing its position in
+the source:
+
+* PythonCode: a block of Python code ('{+ ... }') at the top level;
+* Statement: a function name (like '#play') and its arguments;
+* Argument: an argument, kept as written (with braces, if any).
+
+The parser never copies the remaining source, so that parsing a
+long script (like a world's 'config.set') takes linear time.
+
+"""
+
+from bisect import bisect_right
+import re
+from textwrap import dedent
+
+from sharp.exceptions import SharpSyntaxError
+
+# Constants
+LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+RE_LINE_END = re.compile("[" + LINE_BREAKS + "]")
+RE_WORD_END = re.compile("[ " + LINE_BREAKS + "]")
+RE_BRACES = re.compile(r"[{}]")
+RE_NEWLINES = re.compile(r"\n")
+
+class Node:
+
+    """Base class for the nodes of the syntax tree.
+
+    'start' and 'end' are the positions (indexes) of the node in the
+    source, 'line' is its line number (beginning at 1).
+
+    """
+
+    def __init__(self, start, end, line):
+        self.start = start
+        self.end = end
+        self.line = line
+
+
+class PythonCode(Node):
+
+    """A block of Python code."""
+
+    def __init__(self, code, start, end, line):
+        super().__init__(start, end, line)
+        self.code = code
+
+    def __repr__(self):
+        return "<PythonCode at line {}>".format(self.line)
+
+
+class Argument(Node):
+
+    """An argument of a statement, as written in the source."""
+
+    def __init__(self, text, start, end, line):
+        super().__init__(start, end, line)
+        self.text = text
+
+    def __repr__(self):
+        return "<Argument {} at line {}>".format(repr(self.text), self.line)
+
+
+class Statement(Node):
+
+    """A statement, with its function name and its arguments."""
+
+    def __init__(self, function, arguments, start, end, line):
+        super().__init__(start, end, line)
+        self.function = function
+        self.arguments = arguments
+
+    def __repr__(self):
+        return "<Statement {} at line {}>".format(self.function, self.line)
+
+    def as_tuple(self):
+        """Return the tuple (function, argument1, argument2, ...)."""
+        return (self.function, ) + tuple(
+                argument.text for argument in self.arguments)
+
+
+class Parser:
+
+    """SharpScript parser, reading a source string.
+
+    Use the 'parse' method to get the list of nodes.
+
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self.size = len(content.rstrip())
+        self.newlines = None
+
+    def line(self, position):
+        """Return the line number of a position in the source."""
+        if self.newlines is None:
+            self.newlines = [match.start() for match in \
+                    RE_NEWLINES.finditer(self.content)]
+
+        return bisect_right(self.newlines, position - 1) + 1
+
+    def parse(self, first=False, python=False):
+        """Parse the source and return a tuple (nodes, rest).
+
+        If 'python' is True, the blocks of Python code at the very
+        beginning of the source are returned as PythonCode nodes.
+        If 'first' is True, only the first statement is read.  The
+        rest is the source that hasn't been read.
+
+        """
+        content = self.content
+        nodes = []
+        i = 0
+        if python:
+            while content.startswith("{+", i):
+                end = self.find_right_brace(i)
+                code = content[i + 2:end - 1].lstrip("\n").rstrip("\n ")
+                nodes.append(PythonCode(dedent(code), i, end + 1,
+                        self.line(i)))
+                i = end + 1
+
+        statements, i = self.parse_statements(i, first=first)
+        nodes.extend(statements)
+        return nodes, content[i:]
+
+    def parse_statements(self, i=0, first=False):
+        """Parse the statements, return a tuple (statements, position).
+
+        A statement is one-line short at the very least.  It can be
+        longer by that, if it's enclosed into braces.
+
+        """
+        content = self.content
+        statements = []
+        function = None
+        arguments = []
+        start = end = i
+        while True:
+            # If remaining is empty, saves the statement and exits the loop
+            if i >= self.size:
+                if function:
+                    statements.append(Statement(function, arguments,
+                            start, end, self.line(start)))
+                break
+
+            char = content[i]
+
+            # If remaining begins with a new line
+            if char == "\n":
+                if function:
+                    statements.append(Statement(function, arguments,
+                            start, end, self.line(start)))
+
+                    if first:
+                        break
+
+                    function = None
+                    arguments = []
+
+                i += 1
+                continue
+
+            # If remaining begins with a space
+            if char.isspace():
+                i += 1
+                continue
+
+            # If the function is not defined, take the first parameter
+            if function is None:
+                start = i
+                if content.startswith("#", i) and not content.startswith(
+                        "##", i):
+                    # This is obviously a function name
+                    end = self.find_end(RE_WORD_END, i)
+                    function = content[i:end]
+                    arguments = []
+                else:
+                    function = "#send"
+                    end = self.find_end(RE_LINE_END, i)
+                    arguments = [self.argument(i, end)]
+            elif char == "{":
+                end = self.find_right_brace(i) + 1
+                arguments.append(self.argument(i, end))
+            else:
+                end = self.find_end(RE_WORD_END, i)
+                arguments.append(self.argument(i, end))
+
+            i = end
+
+        return statements, i
+
+    def argument(self, start, end):
+        """Return the argument between start and end."""
+        text = self.content[start:end]
+        if text.startswith("##"):
+            text = text[1:]
+
+        return Argument(text, start, end, self.line(start))
+
+    def find_end(self, regex, i):
+        """Return the position of the first match of regex, or the end."""
+        match = regex.search(self.content, i)
+        return match.start() if match else len(self.content)
+
+    def find_right_brace(self, i):
+        """Return the position of the brace closing the one at i."""
+        end = find_right_brace(self.content, i)
+        if end is None:
+            raise SharpSyntaxError("the brace at line {} isn't " \
+                    "closed".format(self.line(i)))
+
+        return end
+
+
+def find_right_brace(text, start=0):
+    """Find the right brace matching the opening one at start.
+
+    Return the position of the closing brace, or None if the brace
+    isn't closed.
+
+    """
+    level = 0
+    for match in RE_BRACES.finditer(text, start):
+        if match.group() == "{":
+            level += 1
+        else:
+            level -= 1
+
+        if level <= 0:
+            return match.start()
+
+    return None
@@ -0,0 +1,150 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the Profiler class.
+
+The profiler records the time spent in scripts, triggers, aliases
+and SharpScript functions, to find out what makes a world slow.  It
+is disabled by default:  when it is, the instrumented code only
+checks the 'enabled' attribute, and SharpScript functions are not
+wrapped at all.
+
+"""
+
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+# Constants
+SUMMARY_WIDTH = 50
+
+def summarize(text):
+    """Return the first line of a text, shortened if necessary."""
+    lines = text.strip().splitlines()
+    summary = lines[0] if lines else ""
+    if len(lines) > 1 or len(summary) > SUMMARY_WIDTH:
+        summary = summary[:SUMMARY_WIDTH - 4] + " ..."
+
+    return summary
+
+
+class Stat:
+
+    """Statistics about one profiled object."""
+
+    __slots__ = ("kind", "name", "calls", "matches", "total", "max")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.calls = 0
+        self.matches = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __repr__(self):
+        return "<Stat {} {}: {} calls, {:.3f}s>".format(self.kind,
+                repr(self.name), self.calls, self.total)
+
+    def add(self, elapsed, matched=False):
+        """Add a call that took 'elapsed' seconds."""
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        if matched:
+            self.matches += 1
+
+
+class Profiler:
+
+    """Profiler of a SharpScript engine.
+
+    Statistics are kept by kind ("script", "compile", "trigger",
+    "alias" or "function") and name (the first line of the
+    script, the trigger's reaction, the alias or the function's
+    name).  Triggers are tested in the trigger worker, so recording
+    is protected by a lock.
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self.lock = Lock()
+
+    def record(self, kind, name, elapsed, matched=False):
+        """Record a call of 'elapsed' seconds."""
+        key = (kind, name)
+        with self.lock:
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = Stat(kind, name)
+
+            stat.add(elapsed, matched)
+
+    def wrap(self, kind, name, function):
+        """Return a wrapper recording the calls to function."""
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(kind, name, perf_counter() - start)
+
+        return wrapper
+
+    def reset(self):
+        """Remove all statistics."""
+        with self.lock:
+            self.stats.clear()
+
+    def top(self, count=10, kind=None):
+        """Return the statistics with the highest cumulative time."""
+        with self.lock:
+            stats = [stat for stat in self.stats.values()
+                    if kind is None or stat.kind == kind]
+
+        stats.sort(key=lambda stat: stat.total, reverse=True)
+        return stats[:count]
+
+    def report(self, count=10, kind=None):
+        """Return the lines of a report on the top offenders."""
+        lines = []
+        for stat in self.top(count, kind):
+            line = "{:<8} {}: {} calls".format(stat.kind,
+                    summarize(stat.name), stat.calls)
+            if stat.kind in ("trigger", "alias"):
+                line += ", {} matches".format(stat.matches)
+
+            line += ", {:.1f}ms total, {:.1f}ms max".format(
+                    stat.total * 1000, stat.max * 1000)
+            lines.append(line)
+
+        return lines
@@ -0,0 +1,237 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the Scheduler class.
+
+The scheduler holds the SharpScript scripts that have been paused
+(by '#pause'), until they resume.  It uses a single timer, set to
+the next script to resume, instead of one timer per paused script.
+
+"""
+
+from heapq import heappop, heappush
+from itertools import count
+
+from twisted.internet import reactor
+
+from log import logger
+
+# Constants, used when the engine has no settings
+MAX_PENDING = 100 # maximum number of paused scripts
+MAX_STEPS = 1000 # maximum number of resumed steps per second
+
+class Task:
+
+    """A running SharpScript script.
+
+    The task holds the source code of the script, an iterator on
+    the compiled statements that remain to be executed, the
+    statement being executed (a generator) and the script's scope
+    of variables.
+
+    """
+
+    __slots__ = ("id", "source", "to_process", "code", "scope", "debug",
+            "variables", "due")
+
+    def __init__(self, source, to_process, scope, debug=False,
+            variables=False):
+        self.id = None
+        self.source = source
+        self.to_process = to_process
+        self.code = None
+        self.scope = scope
+        self.debug = debug
+        self.variables = variables
+        self.due = None
+
+    def __repr__(self):
+        return "<Task #{} {}>".format(self.id, repr(self.summary))
+
+    @property
+    def summary(self):
+        """Return the first line of the source code."""
+        lines = self.source.strip().splitlines()
+        summary = lines[0] if lines else ""
+        if len(lines) > 1:
+            summary += " ..."
+
+        return summary
+
+
+class Scheduler:
+
+    """Scheduler of the paused scripts of a SharpScript engine.
+
+    Paused scripts are kept in 'tasks' (a dictionary of task IDs to
+    tasks), and in a heap sorted by the time they should resume.
+    A single timer is set to the next script to resume.  The
+    scheduler enforces two limits:
+
+    * No more than 'options.scripts.max_paused' scripts can be
+      paused at a time.  Scripts pausing beyond this limit are
+      stopped.
+    * No more than 'options.scripts.max_steps' statements of resumed
+      scripts are executed in a second.  Beyond this limit, scripts
+      are delayed to the next second.  This slows down a runaway
+      loop of '#pause', until it is stopped with '#scripts kill'.
+
+    The limits are read in the settings of the session's engine
+    when needed, MAX_PENDING and MAX_STEPS are used without engine.
+
+    """
+
+    def __init__(self, engine, clock=None):
+        self.engine = engine
+        self.clock = clock or reactor
+        self.tasks = {}
+        self.queue = []
+        self.ids = count(1)
+        self.timer = None
+        self.window = 0
+        self.steps = 0
+        self.logger = logger("sharp")
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def schedule(self, task, delay):
+        """Pause the task for 'delay' seconds.
+
+        Return whether the task has been scheduled.  It isn't if
+        there are already too many paused scripts.
+
+        """
+        if len(self.tasks) >= self.setting("max_paused", MAX_PENDING):
+            self.logger.warning("#{}: too many paused scripts, " \
+                    "stopping {}".format(self.engine.id, task))
+            scripts = self.engine.functions["scripts"]
+            self.engine.warn(scripts.t("too_many",
+                    "Too many paused scripts, the script {summary} " \
+                    "has been stopped.").format(
+                    summary=repr(task.summary)))
+            task.code.close()
+            return False
+
+        if task.id is None:
+            task.id = next(self.ids)
+
+        task.due = self.clock.seconds() + max(delay, 0)
+        self.tasks[task.id] = task
+        heappush(self.queue, (task.due, task.id))
+        self.reschedule()
+        return True
+
+    def reschedule(self):
+        """Set the timer to the next task to resume."""
+        queue = self.queue
+        while queue and queue[0][1] not in self.tasks:
+            heappop(queue)
+
+        if not queue:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            return
+
+        due = queue[0][0]
+        if self.timer is not None:
+            if self.timer.getTime() <= due:
+                return
+
+            self.timer.cancel()
+
+        delay = max(due - self.clock.seconds(), 0)
+        self.timer = self.clock.callLater(delay, self.tick)
+
+    def tick(self):
+        """Resume the tasks that are due."""
+        self.timer = None
+        now = self.clock.seconds()
+        queue = self.queue
+        while queue and queue[0][0] <= now:
+            due, id = heappop(queue)
+            task = self.tasks.get(id)
+            if task is None or task.due != due:
+                continue
+
+            del self.tasks[id]
+            self.engine.resume(task)
+
+        self.reschedule()
+
+    def setting(self, name, default):
+        """Return the limit in the settings, or default without engine."""
+        engine = self.engine.engine
+        if engine is None:
+            return default
+
+        return engine.settings["options.scripts." + name]
+
+    def step(self):
+        """Count a step of a resumed task.
+
+        Return the time to wait before the next step, 0 if it can
+        be executed now.
+
+        """
+        now = self.clock.seconds()
+        if now - self.window >= 1:
+            self.window = now
+            self.steps = 0
+
+        if self.steps >= self.setting("max_steps", MAX_STEPS):
+            return self.window + 1 - now
+
+        self.steps += 1
+        return 0
+
+    def list(self):
+        """Return the paused tasks, the first to resume first."""
+        return sorted(self.tasks.values(), key=lambda task: task.due)
+
+    def kill(self, id=None):
+        """Stop a paused task, or all of them if id is None.
+
+        Return the number of stopped tasks.
+
+        """
+        if id is None:
+            tasks = list(self.tasks.values())
+        else:
+            task = self.tasks.get(id)
+            tasks = [task] if task else []
+
+        for task in tasks:
+            del self.tasks[task.id]
+            task.code.close()
+
+        if tasks:
+            self.reschedule()
+
+        return len(tasks)
@@ -0,0 +1,152 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the Scope class."""
+
+class Scope:
+
+    """The scope of variables of a running script.
+
+    Scripts read and write the variables of the SharpScript engine
+    directly, through their scope, so that only the modified
+    variables are written.  The 'args' variable (the groups of the
+    trigger or alias that started the script) is kept in the scope,
+    so that scripts paused at the same time don't modify each
+    other's 'args'.
+
+    The Python code in scripts is executed by 'run', in a single
+    namespace reading through to the variables and the engine's
+    globals (see 'Namespace'), so that functions defined in the code
+    can see the other names defined in the same block.
+
+    """
+
+    __slots__ = ("variables", "args")
+
+    def __init__(self, variables, args=None):
+        self.variables = variables
+        self.args = args if args is not None else {}
+
+    def __repr__(self):
+        return "<Scope args={}>".format(self.args)
+
+    def __getitem__(self, name):
+        if name == "args":
+            return self.args
+
+        return self.variables[name]
+
+    def __setitem__(self, name, value):
+        if name == "args":
+            self.args = value
+        else:
+            self.variables[name] = value
+
+    def __delitem__(self, name):
+        if name == "args":
+            self.args = {}
+        else:
+            del self.variables[name]
+
+    def __contains__(self, name):
+        return name == "args" or name in self.variables
+
+    def get(self, name, default=None):
+        """Return the value of a variable, or default."""
+        if name == "args":
+            return self.args
+
+        return self.variables.get(name, default)
+
+    def run(self, code, globals):
+        """Execute compiled Python code with the variables.
+
+        The code is executed in a namespace reading through to the
+        variables and the globals (see 'Namespace').  Only the
+        names written or deleted by the code are then committed.
+
+        """
+        namespace = Namespace(self, globals)
+        exec(code, namespace)
+        namespace.commit()
+
+
+class Namespace(dict):
+
+    """The namespace of a block of Python code in a script.
+
+    The dictionary only holds the names written by the code.  Other
+    names are read in the scope, then in the engine's globals, when
+    first needed:  nothing is copied.  Functions defined in the
+    block use the namespace as their globals, so they can see the
+    other names of the block.
+
+    """
+
+    def __init__(self, scope, globals):
+        super().__init__()
+        self.scope = scope
+        self.globals = globals
+        self.deleted = set()
+        dict.__setitem__(self, "__builtins__", globals["__builtins__"])
+
+    def __missing__(self, name):
+        if name in self.deleted:
+            raise KeyError(name)
+
+        if name in self.scope:
+            return self.scope[name]
+
+        return self.globals[name]
+
+    def __setitem__(self, name, value):
+        self.deleted.discard(name)
+        super().__setitem__(name, value)
+
+    def __delitem__(self, name):
+        if name in self.deleted:
+            raise KeyError(name)
+
+        written = dict.__contains__(self, name)
+        if written:
+            super().__delitem__(name)
+        elif name not in self.scope:
+            raise KeyError(name)
+
+        self.deleted.add(name)
+
+    def commit(self):
+        """Write the names written or deleted in the scope."""
+        scope = self.scope
+        for name in self.deleted:
+            if name in scope:
+                del scope[name]
+
+        for name, value in self.items():
+            if name != "__builtins__":
+                scope[name] = value
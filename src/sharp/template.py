@@ -0,0 +1,122 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Module containing the Template class, to replace variables in text.
+
+Variables can be written in two ways:
+    $variable (when surrounded by special characters)
+    ${variable} (if not).
+
+A variable whose name is a number (like $1) is read from the 'args'
+variable.  The dollar sign can be escaped with \\$.
+
+A text is compiled once into a template:  a list of literal pieces
+and of variables to look up.  Use 'compile_template' to get the
+template of a text, compiled templates being kept in a cache.
+
+"""
+
+from functools import lru_cache
+import re
+
+# Constants
+RE_VAR = re.compile(r"(?<!\\)\$\{?([A-Za-z0-9_]+)\}?")
+CACHE_SIZE = 1024
+
+class Template:
+
+    """A text in which variables have to be replaced.
+
+    The pieces are either str (literal text, already unescaped) or
+    tuples (is_arg, name) for the variables.
+
+    """
+
+    __slots__ = ("text", "pieces", "constant")
+
+    def __init__(self, text):
+        self.text = text
+        self.pieces = []
+        position = 0
+        for match in RE_VAR.finditer(text):
+            literal = text[position:match.start()].replace("\\$", "$")
+            if literal:
+                self.pieces.append(literal)
+
+            name = match.group(1)
+            self.pieces.append((name.isdigit(), name))
+            position = match.end()
+
+        literal = text[position:].replace("\\$", "$")
+        if literal:
+            self.pieces.append(literal)
+
+        # If there's no variable, the result is always the same
+        if all(isinstance(piece, str) for piece in self.pieces):
+            self.constant = "".join(self.pieces)
+        else:
+            self.constant = None
+
+    def __repr__(self):
+        return "<Template {}>".format(repr(self.text))
+
+    @property
+    def variables(self):
+        """Return the list of variables in the template."""
+        return [piece for piece in self.pieces if not isinstance(piece, str)]
+
+    def lookup(self, variables, is_arg, name):
+        """Return the value of a variable, or an empty string."""
+        if is_arg:
+            return variables.get("args", {}).get(name, "")
+
+        return variables.get(name, "")
+
+    def render(self, variables):
+        """Return the text with the variables replaced."""
+        if self.constant is not None:
+            return self.constant
+
+        args = variables.get("args", {})
+        parts = []
+        for piece in self.pieces:
+            if isinstance(piece, str):
+                parts.append(piece)
+            else:
+                is_arg, name = piece
+                value = args.get(name, "") if is_arg else variables.get(
+                        name, "")
+                parts.append(str(value))
+
+        return "".join(parts)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_template(text):
+    """Return the template of a text, compiling it if needed."""
+    return Template(text)
@@ -0,0 +1,170 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""This file contains the StyledText class.
+
+Text received from the server can contain ANSI codes (to change the
+color of the text, for instance).  Triggers, the session log and the
+screen reader need the text without these codes, while the output
+field needs the codes to apply styles.  The StyledText class holds
+both:  the text without ANSI codes and the list of codes with their
+position in this text.  The text is parsed only once, when received.
+
+"""
+
+import re
+
+# Constants
+RE_ANSI = re.compile(r"\x1b\[([0-9;]*)([A-Za-z])")
+
+class StyledText:
+
+    """Text without ANSI codes, with the codes kept aside.
+
+    Attributes:
+        text: the text without ANSI codes (str).
+        codes: a list of tuples (position, parameters), where position
+                is the index in 'text' where the code applies, and
+                parameters is the str between '\\x1b[' and 'm'
+                (like '1;31').
+
+    Use the 'parse' class method to create a StyledText from a
+    string containing ANSI codes.
+
+    """
+
+    __slots__ = ("text", "codes")
+
+    def __init__(self, text="", codes=None):
+        self.text = text
+        self.codes = codes if codes is not None else []
+
+    def __repr__(self):
+        return "<StyledText {} ({} codes)>".format(
+                repr(self.text), len(self.codes))
+
+    def __str__(self):
+        return self.text
+
+    def __len__(self):
+        return len(self.text)
+
+    def __eq__(self, other):
+        if isinstance(other, StyledText):
+            return self.text == other.text and self.codes == other.codes
+
+        return NotImplemented
+
+    @classmethod
+    def parse(cls, text):
+        """Parse the text containing ANSI codes and return a StyledText."""
+        if "\x1b" not in text:
+            return cls(text)
+
+        pieces = []
+        codes = []
+        position = 0
+        last = 0
+        for match in RE_ANSI.finditer(text):
+            piece = text[last:match.start()]
+            pieces.append(piece)
+            position += len(piece)
+            last = match.end()
+
+            # Only keep style codes, drop other sequences (like '\x1b[2J')
+            parameters, final = match.groups()
+            if final == "m":
+                codes.append((position, parameters))
+
+        pieces.append(text[last:])
+        return cls("".join(pieces), codes)
+
+    @classmethod
+    def join(cls, separator, styled_texts):
+        """Join several StyledText objects with the separator (a str)."""
+        pieces = []
+        codes = []
+        position = 0
+        for i, styled in enumerate(styled_texts):
+            if i > 0:
+                pieces.append(separator)
+                position += len(separator)
+
+            pieces.append(styled.text)
+            codes.extend((position + offset, parameters) for \
+                    offset, parameters in styled.codes)
+            position += len(styled.text)
+
+        return cls("".join(pieces), codes)
+
+    def splitlines(self):
+        """Return a list of StyledText, one for each line."""
+        lines = []
+        codes = self.codes
+        index = 0
+        start = 0
+        text = self.text
+        for line, content in zip(text.splitlines(True), text.splitlines()):
+            end = start + len(line)
+            line_codes = []
+            while index < len(codes) and codes[index][0] < end:
+                position, parameters = codes[index]
+                line_codes.append((min(position - start, len(content)),
+                        parameters))
+                index += 1
+
+            lines.append(type(self)(content, line_codes))
+            start = end
+
+        # Codes at the very end of the text
+        if index < len(codes):
+            if not lines:
+                lines.append(type(self)())
+            last = lines[-1]
+            last.codes.extend((len(last.text), parameters) for \
+                    position, parameters in codes[index:])
+
+        return lines
+
+    @property
+    def ansi(self):
+        """Return the text with the ANSI codes inserted back."""
+        pieces = []
+        last = 0
+        text = self.text
+        for position, parameters in self.codes:
+            pieces.append(text[last:position])
+            pieces.append("\x1b[" + parameters + "m")
+            last = position
+
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+    def without_codes(self):
+        """Return a StyledText with the same text and no code."""
+        return type(self)(self.text)
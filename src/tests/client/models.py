@@ -31,6 +31,7 @@ import unittest
 
 from client import Client
 from sharp.engine import SharpScript
+from world import World
 
 class MockClient(unittest.TestCase):
 
@@ -45,6 +46,7 @@ class MockClient(unittest.TestCase):
         peer.port = 4000
         self.client.transport.getPeer = MagicMock(return_value=peer)
         self.client.factory = MagicMock()
+        self.client.factory.world = World("test")
 
         # Create the sharp engine
         sharp = SharpScript(self.client.factory.engine, self.client,
@@ -56,7 +58,13 @@ class MockClient(unittest.TestCase):
             """Private function to return a set of default settings."""
             default = {
                     "options.input.command_stacking": "",
+                    "options.input.send_burst": 10,
+                    "options.input.send_rate": 0,
+                    "options.input.speedwalk": "",
                     "options.general.encoding": "latin-1",
+                    "options.output.trigger_worker": False,
+                    "options.scripts.max_paused": 100,
+                    "options.scripts.max_steps": 1000,
             }
             return default[address]
 
@@ -30,11 +30,17 @@ from unittest.mock import MagicMock
 
 from .models import MockClient
 from scripting.alias import Alias
+from scripting.alias_set import AliasSet
 
 class TestAliases(MockClient):
 
     """Test aliases."""
 
+    def setUp(self):
+        """Keep the world holding the aliases."""
+        super().setUp()
+        self.world = self.client.factory.world
+
     def test_without(self):
         """Test without any aliases."""
         self.client.write("some command")
@@ -95,3 +101,41 @@ class TestAliases(MockClient):
         }
 
         self.client.handle_message.assert_called_once_with("HP = 8", **kwargs)
+
+    def test_word(self):
+        """Test the literal word required by aliases."""
+        sharp = self.client.factory.sharp_engine
+        words = {"co": "co", "k *": "k", "go north": "go", "s*": None,
+                "*x": None, "^k": None, " co": None, "w*=*": None}
+        for pattern, word in words.items():
+            self.assertEqual(Alias(sharp, pattern, "").word, word, pattern)
+
+    def test_same_as_full_scan(self):
+        """Compare the indexed set with testing every alias."""
+        sharp = self.client.factory.sharp_engine
+        patterns = ["co", "k *", "K *", "go north", "s*", "*x", "^k",
+                "kill *", "w*=*", "Ǆ *", "*"]
+        aliases = [Alias(sharp, pattern, "") for pattern in patterns]
+        commands = ["co", "CO", "co x", "k orc", "kill orc", "go north",
+                "sing", "box", "k", "wman=good", "ǆ orc", "ǅ orc", "",
+                " k orc"]
+        alias_set = AliasSet(aliases)
+        for command in commands:
+            expected = [alias for alias in aliases
+                    if alias.re_alias.search(command)]
+            found = [alias for alias in alias_set.candidates(command)
+                    if alias.re_alias.search(command)]
+            self.assertEqual(found[:1], expected[:1], repr(command))
+
+    def test_groups(self):
+        """Test that aliases of disabled groups aren't tested."""
+        alias = Alias(self.client.factory.sharp_engine, "l", "look")
+        alias.group = "travel"
+        self.world.aliases.append(alias)
+        self.world.enable_group("travel", False)
+        self.client.write("l")
+        self.client.transport.write.assert_called_once_with(b"l\r\n")
+        self.world.enable_group("travel")
+        self.client.transport.write = MagicMock()
+        self.client.write("l")
+        self.client.transport.write.assert_called_once_with(b"look\r\n")
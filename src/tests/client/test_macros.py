@@ -0,0 +1,79 @@
+﻿# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from unittest.mock import MagicMock
+
+from .models import MockClient
+from scripting.macro import Macro
+
+class TestMacros(MockClient):
+
+    """Test of macros."""
+
+    def setUp(self):
+        """Add a macro to the world."""
+        super().setUp()
+        self.world = self.client.factory.world
+        self.sharp = self.client.factory.sharp_engine
+        self.macro = Macro(340, 0, "north", self.sharp)
+        self.world.add_macro(self.macro)
+
+    def test_match(self):
+        """Test that a macro is executed by its key."""
+        self.assertTrue(self.client.test_macros(340, 0))
+        self.client.transport.write.assert_called_once_with(b"north\r\n")
+
+    def test_no_lock(self):
+        """Test that keys without macro don't take the world's lock."""
+        self.world.lock = MagicMock()
+        self.assertFalse(self.client.test_macros(340, 2))
+        self.assertFalse(self.client.test_macros(ord("a"), 0))
+        self.world.lock.__enter__.assert_not_called()
+        self.client.transport.write.assert_not_called()
+
+    def test_index(self):
+        """Test that the index follows the list of macros."""
+        self.world.add_macro(Macro(340, 0, "south", self.sharp))
+        self.assertEqual(len(self.world.macros), 1)
+        self.world.add_macro(Macro(341, 0, "south", self.sharp))
+        self.assertIn((341, 0), self.world.macro_index)
+
+        # Changing the shortcut of a macro in place
+        self.macro.modifiers = 2
+        self.world.macros.reindex()
+        self.assertFalse(self.client.test_macros(340, 0))
+        self.assertTrue(self.client.test_macros(340, 2))
+
+        # Appending doesn't rebuild the index
+        index = self.world.macro_index
+        self.world.add_macro(Macro(342, 0, "east", self.sharp))
+        self.assertIs(self.world.macro_index, index)
+        self.assertTrue(self.client.test_macros(342, 0))
+
+        # Replacing the list
+        self.world.macros = []
+        self.assertFalse(self.client.test_macros(340, 2))
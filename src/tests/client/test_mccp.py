@@ -0,0 +1,90 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest.mock import MagicMock, call
+import zlib
+
+from twisted.conch.telnet import IAC, DO, DONT, SB, SE, WILL
+
+import client
+from .models import MockClient
+
+START = IAC + SB + client.COMPRESS2 + IAC + SE
+
+class TestMCCP(MockClient):
+
+    """Test the compression of data (MCCP v2)."""
+
+    def setUp(self):
+        """Connect the client and negotiate the compression."""
+        super().setUp()
+        self.client.connectionMade()
+        self.client.receive_text = MagicMock()
+        self.client.dataReceived(IAC + WILL + client.COMPRESS2)
+        self.client.transport.write.assert_called_once_with(
+                IAC + DO + client.COMPRESS2)
+        self.client.transport.write.reset_mock()
+
+    def received(self):
+        """Return the text received by the client."""
+        return "".join(args[0] for args, kwargs in \
+                self.client.receive_text.call_args_list)
+
+    def test_start(self):
+        """Test compression starting in the middle of a packet."""
+        compressor = zlib.compressobj()
+        data = b"plain\n" + START + compressor.compress(b"compressed\n")
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.client.dataReceived(data)
+        self.assertEqual(self.received(), "plain\ncompressed\n")
+        self.assertIsNotNone(self.client.decompressor)
+        self.assertEqual(self.client.decompressed_bytes, 11)
+
+    def test_split(self):
+        """Test the compression start split over several packets."""
+        compressor = zlib.compressobj()
+        data = START + compressor.compress(b"compressed\n")
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        for i in range(len(data)):
+            self.client.dataReceived(data[i:i + 1])
+
+        self.assertEqual(self.received(), "compressed\n")
+
+    def test_end(self):
+        """Test the end of the compressed stream."""
+        data = START + zlib.compress(b"compressed\n") + b"plain\n"
+        self.client.dataReceived(data)
+        self.assertEqual(self.received(), "compressed\nplain\n")
+        self.assertIsNone(self.client.decompressor)
+
+    def test_error(self):
+        """Test corrupted compressed data."""
+        self.client.dataReceived(START + b"not compressed")
+        self.assertIsNone(self.client.decompressor)
+        self.client.transport.write.assert_called_once_with(
+                IAC + DONT + client.COMPRESS2)
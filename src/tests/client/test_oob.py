@@ -0,0 +1,121 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest.mock import MagicMock, call
+
+from twisted.conch.telnet import IAC, DO, SB, SE, WILL
+
+from .models import MockClient
+from oob import GMCP, MSDP, OOBState, encode_GMCP, encode_MSDP, parse_MSDP
+from scripting.event import Event
+from sharp.engine import SharpScript
+from world import World
+
+class TestOOB(MockClient):
+
+    """Test the out-of-band data (GMCP and MSDP)."""
+
+    def setUp(self):
+        """Connect the client with a real world and state."""
+        super().setUp()
+        self.world = World("test")
+        self.client.factory.world = self.world
+        self.client.factory.session.oob = OOBState()
+        self.client.connectionMade()
+        self.client.transport.write.reset_mock()
+        self.state = self.client.factory.session.oob
+
+    def add(self, package, action):
+        """Add an event to the world and return it."""
+        event = Event(self.client.factory.sharp_engine, package, action)
+        self.world.add_event(event)
+        return event
+
+    def receive(self, option, data):
+        """Receive a subnegotiation."""
+        self.client.dataReceived(IAC + SB + option + data + IAC + SE)
+
+    def test_negotiation(self):
+        """Test the messages sent when GMCP and MSDP are enabled."""
+        self.client.dataReceived(IAC + WILL + GMCP)
+        calls = self.client.transport.write.call_args_list
+        self.assertEqual(calls[0], call(IAC + DO + GMCP))
+        self.assertTrue(calls[1][0][0].startswith(
+                IAC + SB + GMCP + b"Core.Hello {"))
+        self.assertEqual(len(calls), 3)
+
+        self.client.transport.write.reset_mock()
+        self.client.dataReceived(IAC + WILL + MSDP)
+        self.client.transport.write.assert_has_calls([call(IAC + DO + MSDP),
+                call(IAC + SB + MSDP + encode_MSDP(
+                {"LIST": "REPORTABLE_VARIABLES"}) + IAC + SE)])
+
+    def test_GMCP(self):
+        """Test receiving GMCP messages, merged in the state."""
+        self.receive(GMCP, encode_GMCP("Char.Vitals", {"hp": 10, "mp": 5}))
+        self.receive(GMCP, encode_GMCP("Char.Vitals", {"hp": 8}))
+        self.receive(GMCP, b"Room.Info {not JSON")
+        self.assertEqual(self.state.get("Char.Vitals"), {"hp": 8, "mp": 5})
+        self.assertEqual(self.state.get("Char"), {"Vitals": {"hp": 8,
+                "mp": 5}})
+        self.assertIsNone(self.state.get("Room.Info"))
+
+    def test_MSDP(self):
+        """Test receiving MSDP variables."""
+        variables = {"HEALTH": "10", "ROOM": {"NAME": "Hall",
+                "EXITS": {"n": "1"}}, "AFFECTS": ["blind", "deaf"]}
+        self.assertEqual(parse_MSDP(encode_MSDP(variables)), variables)
+        self.receive(MSDP, encode_MSDP({"REPORTABLE_VARIABLES": ["HEALTH",
+                "ROOM"]}))
+        self.client.transport.write.assert_called_once_with(
+                IAC + SB + MSDP + encode_MSDP({"REPORT": ["HEALTH",
+                "ROOM"]}) + IAC + SE)
+        self.receive(MSDP, encode_MSDP(variables))
+        self.assertEqual(self.state.get("MSDP.ROOM.NAME"), "Hall")
+        self.assertEqual(self.state.get("MSDP.HEALTH"), "10")
+
+    def test_events(self):
+        """Test the events fired by an updated package."""
+        self.add("Char.Vitals", "hp $hp")
+        self.add("char", "char $1")
+        self.add("Room", "room")
+        self.assertIn("#event Char.Vitals {hp $hp}",
+                [event.sharp_script for event in self.world.events])
+        self.receive(GMCP, encode_GMCP("Char.Vitals", {"hp": 10}))
+        self.assertEqual(self.client.transport.write.call_args_list,
+                [call(b"hp 10\r\n"), call(b"char Char.Vitals\r\n")])
+
+    def test_sharp(self):
+        """Test creating an event in SharpScript."""
+        sharp = SharpScript(self.client.factory.engine, self.client,
+                self.world)
+        sharp.execute(
+                "#event MSDP.HEALTH {#send {health $2}}")
+        self.receive(MSDP, encode_MSDP({"HEALTH": "7"}))
+        self.client.transport.write.assert_called_once_with(
+                b"health 7\r\n")
@@ -0,0 +1,134 @@
+﻿# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from unittest.mock import MagicMock
+
+from twisted.internet.task import Clock
+
+from .models import MockClient
+from outbound import OutboundPipeline, USER
+from scripting.alias import Alias
+
+class TestSendQueue(MockClient):
+
+    """Test the throttled send queue."""
+
+    def setUp(self):
+        """Throttle to 2 commands per second, 3 at once."""
+        super().setUp()
+        self.clock = Clock()
+        self.client._pipeline = OutboundPipeline(self.client, self.clock)
+        self.queue = self.client.pipeline.queue
+        settings = {
+                "options.input.command_stacking": ";",
+                "options.general.encoding": "utf-8",
+                "options.input.send_burst": 3,
+                "options.input.send_rate": 2,
+                "options.input.speedwalk": "",
+        }
+        self.client.factory.engine.settings.__getitem__ = MagicMock(
+                side_effect=settings.__getitem__)
+        self.sent = []
+        transport = self.client.transport
+        transport.write.side_effect = self.sent.append
+        transport.writeSequence.side_effect = self.sent.extend
+
+    def test_burst(self):
+        """Test that commands beyond the burst wait for the rate."""
+        self.client.write("1;2;3;4;5")
+        self.assertEqual(self.sent, [b"1\r\n", b"2\r\n", b"3\r\n"])
+        self.assertEqual(len(self.queue), 2)
+        self.clock.advance(0.5)
+        self.assertEqual(self.sent[3:], [b"4\r\n"])
+        self.clock.advance(0.5)
+        self.assertEqual(self.sent[4:], [b"5\r\n"])
+        self.assertEqual(len(self.queue), 0)
+        self.assertFalse(self.clock.getDelayedCalls())
+
+    def test_refill(self):
+        """Test that the bucket is refilled while nothing is sent."""
+        self.client.write("1;2;3")
+        self.clock.advance(10)
+        self.client.write("4;5;6;7")
+        self.assertEqual(len(self.sent), 6)
+        self.assertEqual(len(self.queue), 1)
+
+    def test_priority(self):
+        """Test that the user input is sent before the script output."""
+        self.client.write("1;2;3;s1;s2")
+        self.client.write("look", priority=USER)
+        self.assertEqual(self.queue.lengths, (1, 2))
+        self.clock.advance(0.5)
+        self.assertEqual(self.sent[3:], [b"look\r\n"])
+        self.clock.advance(1)
+        self.assertEqual(self.sent[4:], [b"s1\r\n", b"s2\r\n"])
+
+    def test_alias_priority(self):
+        """Test that the action of an alias keeps the user's priority."""
+        sharp = self.client.factory.sharp_engine
+        self.client.factory.world.add_alias(Alias(sharp, "greet",
+                "say hello\n#send {wave}"))
+        self.client.write("1;2;3;s1;s2")
+        self.client.write("n;greet", priority=USER)
+        self.assertEqual(self.queue.lengths, (3, 2))
+        self.clock.advance(1.5)
+        self.assertEqual(self.sent[3:],
+                [b"n\r\n", b"say hello\r\n", b"wave\r\n"])
+
+        # Commands sent by scripts after the alias are back to SCRIPT
+        self.client.write("s3")
+        self.assertEqual(self.queue.lengths, (0, 3))
+
+    def test_unlimited(self):
+        """Test that a rate of 0 sends everything at once."""
+        self.client.factory.engine.settings.__getitem__.side_effect = {
+                "options.input.command_stacking": ";",
+                "options.general.encoding": "utf-8",
+                "options.input.send_burst": 3,
+                "options.input.send_rate": 0,
+                "options.input.speedwalk": "",
+        }.__getitem__
+        self.client.write("1;2;3;4;5")
+        self.assertEqual(len(self.sent), 5)
+        self.assertEqual(len(self.queue), 0)
+
+    def test_sharp(self):
+        """Test reporting, flushing and clearing with '#queue'."""
+        self.client.handle_message = MagicMock()
+        sharp = self.client.factory.sharp_engine
+        self.client.write("1;2;3;4;5;6")
+        sharp.execute("#queue")
+        self.client.handle_message.assert_called_with(
+                "3 command(s) waiting (0 from the input, 3 from scripts).")
+        sharp.execute("#queue flush")
+        self.assertEqual(len(self.sent), 6)
+        self.client.write("7;8;9;10")
+        sharp.execute("#queue clear")
+        self.client.handle_message.assert_called_with(
+                "4 command(s) removed.")
+        self.clock.advance(10)
+        self.assertEqual(len(self.sent), 6)
@@ -0,0 +1,129 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest.mock import MagicMock, patch
+
+from twisted.internet.task import Clock
+
+import client
+from .models import MockClient
+
+class TestReception(MockClient):
+
+    """Test the reception of data from the server."""
+
+    def setUp(self):
+        """Connect the client and replace the reactor with a clock."""
+        super().setUp()
+        self.clock = Clock()
+        patcher = patch.object(client, "reactor", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.connectionMade()
+        self.client.handle_lines = MagicMock()
+
+    def set_encoding(self, encoding):
+        """Change the encoding setting."""
+        settings = {
+                "options.input.command_stacking": "",
+                "options.general.encoding": encoding,
+        }
+        self.client.factory.engine.settings.__getitem__ = MagicMock(
+                side_effect=settings.get)
+
+    def test_lines(self):
+        """Test complete lines in one packet."""
+        self.client.applicationDataReceived(b"first\nsecond\n")
+        self.client.handle_lines.assert_called_once_with("first\nsecond")
+
+    def test_split_line(self):
+        """Test a line split across two packets."""
+        self.client.applicationDataReceived(b"You are hun")
+        self.client.handle_lines.assert_not_called()
+        self.client.applicationDataReceived(b"gry.\nYou")
+        self.client.handle_lines.assert_called_once_with("You are hungry.")
+        self.client.handle_lines.reset_mock()
+        self.clock.advance(client.LINE_TIMEOUT)
+        self.client.handle_lines.assert_called_once_with("You")
+
+    def test_split_character(self):
+        """Test a multibyte character split across two packets."""
+        self.set_encoding("utf-8")
+        data = "Vous êtes affamé.\n".encode("utf-8")
+        self.client.applicationDataReceived(data[:6])
+        self.client.applicationDataReceived(data[6:])
+        self.client.handle_lines.assert_called_once_with("Vous êtes affamé.")
+
+    def test_prompt(self):
+        """Test that a Go-Ahead flushes the prompt immediately."""
+        self.client.applicationDataReceived(b"HP: 30> ")
+        self.client.handle_lines.assert_not_called()
+        self.client.handle_GA()
+        self.client.handle_lines.assert_called_once_with("HP: 30> ")
+        self.assertFalse(self.clock.getDelayedCalls())
+
+    def test_GA_queue(self):
+        """Test that data is queued until the Go-Ahead."""
+        self.client.handle_GA()
+        self.client.applicationDataReceived(b"first\n")
+        self.client.applicationDataReceived(b"second\n")
+        self.client.handle_lines.assert_not_called()
+        self.client.handle_GA()
+        self.client.handle_lines.assert_called_once_with("first\nsecond")
+        self.assertEqual(self.client.flushes["GA"], 1)
+
+    def test_GA_age(self):
+        """Test that queued data doesn't wait more than the maximum age."""
+        self.client.handle_GA()
+        self.client.applicationDataReceived(b"first\n")
+        self.clock.advance(client.GA_MAX_AGE / 2)
+        self.client.applicationDataReceived(b"second\n")
+        self.clock.advance(client.GA_MAX_AGE / 2)
+        self.client.handle_lines.assert_called_once_with("first\nsecond")
+        self.assertEqual(self.client.flushes["age"], 1)
+
+    def test_GA_size(self):
+        """Test that a large queue is sent without waiting."""
+        self.client.handle_GA()
+        line = b"x" * 1023 + b"\n"
+        for i in range(client.GA_MAX_SIZE // len(line)):
+            self.client.applicationDataReceived(line)
+        self.assertEqual(self.client.handle_lines.call_count, 1)
+        self.assertEqual(self.client.flushes["size"], 1)
+
+    def test_GA_missed(self):
+        """Test that data isn't queued if the server stops sending GA."""
+        self.client.handle_GA()
+        for i in range(client.GA_MAX_MISSES):
+            self.assertTrue(self.client.has_GA)
+            self.client.applicationDataReceived(b"line\n")
+            self.clock.advance(client.GA_MAX_AGE)
+        self.assertFalse(self.client.has_GA)
+        self.client.handle_lines.reset_mock()
+        self.client.applicationDataReceived(b"line\n")
+        self.client.handle_lines.assert_called_once_with("line")
@@ -0,0 +1,103 @@
+﻿# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+from unittest.mock import MagicMock
+
+from .models import MockClient
+from outbound import MAX_SPEEDWALK, expand_speedwalk
+from scripting.alias import Alias
+
+class TestSpeedwalk(MockClient):
+
+    """Test of speedwalks."""
+
+    def setUp(self):
+        """Use '.' as speedwalk prefix."""
+        super().setUp()
+        self.set_prefix(".")
+
+    def set_prefix(self, prefix):
+        """Use this speedwalk prefix."""
+        settings = {
+                "options.input.command_stacking": ";",
+                "options.general.encoding": "utf-8",
+                "options.input.send_burst": 10,
+                "options.input.send_rate": 0,
+                "options.input.speedwalk": prefix,
+        }
+        self.client.factory.engine.settings.__getitem__ = MagicMock(
+                side_effect=settings.__getitem__)
+
+    def test_expand(self):
+        """Test the expansion of speedwalks."""
+        self.assertEqual(expand_speedwalk(".3n2e", "."),
+                ("n", "n", "n", "e", "e"))
+        self.assertEqual(expand_speedwalk(".SUd", "."), ("s", "u", "d"))
+        self.assertIsNone(expand_speedwalk("3n2e", "."))
+        self.assertIsNone(expand_speedwalk(".", "."))
+        self.assertIsNone(expand_speedwalk(".hello", "."))
+        self.assertIsNone(expand_speedwalk(".3n2", "."))
+        self.assertIsNone(expand_speedwalk(".3n", ""))
+        self.assertIsNone(expand_speedwalk(".{}n".format(MAX_SPEEDWALK + 1),
+                "."))
+
+    def test_cached(self):
+        """Test that speedwalks are expanded once per string."""
+        self.assertIs(expand_speedwalk(".2n3w", "."),
+                expand_speedwalk(".2n3w", "."))
+
+    def test_batch(self):
+        """Test that a speedwalk is written in a single batch."""
+        self.client.write(".2ne")
+        self.client.transport.writeSequence.assert_called_once_with(
+                [b"n\r\n", b"n\r\n", b"e\r\n"])
+
+    def test_stacking(self):
+        """Test speedwalks separated by the command stacking delimiter."""
+        self.client.write(".2n;open door;.e")
+        self.client.transport.writeSequence.assert_called_once_with(
+                [b"n\r\n", b"n\r\n", b"open door\r\n", b"e\r\n"])
+
+    def test_disabled(self):
+        """Test that nothing is expanded without prefix."""
+        self.set_prefix("")
+        self.client.write(".2n")
+        self.client.transport.write.assert_called_once_with(b".2n\r\n")
+
+    def test_raw(self):
+        """Test that speedwalks aren't expanded in raw text."""
+        self.client.factory.sharp_engine.execute("#send .3n")
+        self.client.transport.write.assert_called_once_with(b".3n\r\n")
+
+    def test_alias(self):
+        """Test that speedwalks before an alias are expanded."""
+        sharp = self.client.factory.sharp_engine
+        self.client.factory.world.add_alias(Alias(sharp, "greet", "say hi"))
+        self.client.write(".2s;greet")
+        self.client.transport.writeSequence.assert_called_once_with(
+                [b"s\r\n", b"s\r\n"])
+        self.client.transport.write.assert_called_once_with(b"say hi\r\n")
@@ -29,6 +29,7 @@
 from unittest.mock import MagicMock, call
 
 from .models import MockClient
+from outbound import get_splitter
 from scripting.alias import Alias
 
 class TestCommandStacking(MockClient):
@@ -48,14 +49,17 @@ class TestCommandStacking(MockClient):
             default = {
                     "options.input.command_stacking": ";",
                     "options.general.encoding": "utf-8",
+                    "options.input.send_burst": 10,
+                    "options.input.send_rate": 0,
+                    "options.input.speedwalk": "",
             }
             return default[address]
 
         self.client.factory.engine.settings.__getitem__ = MagicMock(
                 side_effect=get_setting)
         self.client.write("say 1;say 2")
-        calls = [call(b"say 1\r\n"), call(b"say 2\r\n")]
-        self.client.transport.write.assert_has_calls(calls)
+        self.client.transport.writeSequence.assert_called_once_with(
+                [b"say 1\r\n", b"say 2\r\n"])
 
     def test_special(self):
         """Test command stacking with a special character."""
@@ -64,11 +68,59 @@ class TestCommandStacking(MockClient):
             default = {
                     "options.input.command_stacking": "\x82",
                     "options.general.encoding": "utf-8",
+                    "options.input.send_burst": 10,
+                    "options.input.send_rate": 0,
+                    "options.input.speedwalk": "",
             }
             return default[address]
 
         self.client.factory.engine.settings.__getitem__ = MagicMock(
                 side_effect=get_setting)
         self.client.write("say 1\x82say 2")
-        calls = [call(b"say 1\r\n"), call(b"say 2\r\n")]
-        self.client.transport.write.assert_has_calls(calls)
+        self.client.transport.writeSequence.assert_called_once_with(
+                [b"say 1\r\n", b"say 2\r\n"])
+
+    def set_stacking(self, delimiter):
+        """Use this command stacking delimiter."""
+        settings = {
+                "options.input.command_stacking": delimiter,
+                "options.general.encoding": "utf-8",
+                "options.input.send_burst": 10,
+                "options.input.send_rate": 0,
+                "options.input.speedwalk": "",
+        }
+        self.client.factory.engine.settings.__getitem__ = MagicMock(
+                side_effect=settings.__getitem__)
+
+    def test_doubled(self):
+        """Test that a doubled delimiter is sent as is."""
+        self.set_stacking(";")
+        self.client.write("say 1;;2;say 3")
+        self.client.transport.writeSequence.assert_called_once_with(
+                [b"say 1;2\r\n", b"say 3\r\n"])
+
+    def test_splitter(self):
+        """Test that splitters are compiled once per delimiter."""
+        self.assertIs(get_splitter(";"), get_splitter(";"))
+        self.assertIsNot(get_splitter(";"), get_splitter("|"))
+        self.assertIsNone(get_splitter(""))
+
+    def test_alias(self):
+        """Test that commands before an alias are written first."""
+        self.set_stacking(";")
+        sharp = self.client.factory.sharp_engine
+        alias = Alias(sharp, "greet", "say hello")
+        self.client.factory.world.add_alias(alias)
+        self.client.write("look;greet;say 2")
+        self.assertEqual(self.client.transport.write.call_args_list,
+                [call(b"look\r\n"), call(b"say hello\r\n")])
+
+    def test_profiling(self):
+        """Test that the time spent in each stage can be recorded."""
+        self.set_stacking(";")
+        profiler = self.client.factory.sharp_engine.profiler
+        profiler.enabled = True
+        self.client.write("say 1;say 2")
+        names = [stat.name for stat in profiler.stats.values()
+                if stat.kind == "outbound"]
+        self.assertEqual(sorted(names), ["alias", "encode", "split", "write"])
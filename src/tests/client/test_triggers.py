@@ -0,0 +1,214 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest.mock import MagicMock, call, patch
+
+from .models import MockClient
+from scripting.trigger import Trigger
+from scripting.trigger_set import TriggerSet
+import trigger_worker
+from trigger_worker import TriggerWorker
+from world import World
+
+class TestTriggers(MockClient):
+
+    """Test triggers."""
+
+    def setUp(self):
+        """Use a real world to hold the triggers."""
+        super().setUp()
+        self.world = World("test")
+        self.client.factory.world = self.world
+        self.client.handle_message = MagicMock()
+
+    def add(self, reaction, action="", substitution=""):
+        """Add a trigger to the world and return it."""
+        trigger = Trigger(self.client.factory.sharp_engine, reaction, action,
+                substitution)
+        self.world.add_trigger(trigger)
+        return trigger
+
+    def test_literal(self):
+        """Test the literal text required by reactions."""
+        self.assertEqual(self.add("* tells you *").literal, " tells you ")
+        self.assertEqual(self.add("You hit *.").literal, "You hit ")
+        self.assertIsNone(self.add("*").literal)
+        self.assertIsNone(self.add("^You (hit|miss)").literal)
+
+    def test_simple(self):
+        """Test a simple trigger sending a command."""
+        self.add("You are hungry.", "eat bread")
+        self.client.handle_lines("Nothing.\r\nYou are hungry.")
+        self.client.transport.write.assert_called_once_with(b"eat bread\r\n")
+
+    def test_case(self):
+        """Test that reactions still ignore case."""
+        self.add("you are HUNGRY.", "eat bread")
+        self.add("İstanbul is *", "say no")
+        self.client.handle_lines("You are hungry.")
+        self.client.transport.write.assert_called_once_with(b"eat bread\r\n")
+        self.client.transport.write.reset_mock()
+        self.client.handle_lines("istanbul is far")
+        self.client.transport.write.assert_called_once_with(b"say no\r\n")
+
+    def test_longest(self):
+        """Test that the longest reaction wins, then the first defined."""
+        self.add("* arrives.", "say hi")
+        self.add("Bob arrives.", "say hi Bob")
+        self.add("^.* arrives", "say regex")
+        self.client.handle_lines("Bob arrives.")
+        self.client.transport.write.assert_called_once_with(
+                b"say hi Bob\r\n")
+        self.client.transport.write.reset_mock()
+        self.client.handle_lines("Alice arrives.")
+        self.client.transport.write.assert_called_once_with(
+                b"say regex\r\n")
+
+    def test_priority(self):
+        """Test that triggers of higher priority are tested first."""
+        self.add("* arrives.", "say hi").priority = 1
+        self.add("Bob arrives.", "say hi Bob")
+        self.client.handle_lines("Bob arrives.")
+        self.client.transport.write.assert_called_once_with(b"say hi\r\n")
+
+    def test_fallthrough(self):
+        """Test that triggers can let the next ones be tested."""
+        self.add("Bob arrives.", "say hi Bob").fallthrough = True
+        self.add("* arrives.", "say hi")
+        self.add("*", "say anything")
+        self.client.handle_lines("Bob arrives.")
+        self.assertEqual(self.client.transport.write.call_args_list,
+                [call(b"say hi Bob\r\n"), call(b"say hi\r\n")])
+
+    def test_sharp_script(self):
+        """Test that priorities and flags round-trip through SharpScript."""
+        trigger = self.add("* arrives.", "say hi")
+        trigger.priority = 5
+        trigger.fallthrough = True
+        script = trigger.sharp_script
+        self.assertEqual(script,
+                "#trigger {* arrives.} {say hi} {} 5 +fallthrough")
+        self.world.triggers = []
+        sharp = self.client.factory.sharp_engine
+        sharp.functions["trigger"].world = self.world
+        sharp.execute(script)
+        copy = self.world.triggers[0]
+        self.assertEqual((copy.priority, copy.fallthrough), (5, True))
+        self.assertEqual(copy.sharp_script, script)
+
+    def test_groups(self):
+        """Test that triggers of disabled groups aren't tested."""
+        self.add("You are hungry.", "eat bread").group = "idle"
+        self.add("* arrives.", "say hi")
+        sharp = self.client.factory.sharp_engine
+        sharp.functions["group"].world = self.world
+        sharp.execute("#group idle off")
+        self.assertEqual(len(self.world.trigger_set), 1)
+        self.client.handle_lines("You are hungry.")
+        self.client.transport.write.assert_not_called()
+        sharp.execute("#group idle on")
+        self.client.handle_lines("You are hungry.")
+        self.client.transport.write.assert_called_once_with(
+                b"eat bread\r\n")
+
+    def test_shared_pattern(self):
+        """Test that copies share the pattern, compiled when first used."""
+        trigger = self.add("You are hungry.", "eat bread")
+        self.assertIsNone(trigger._re_reaction)
+        copy = trigger.copied
+        self.assertIs(copy.re_reaction, trigger.re_reaction)
+        copy.reaction = "You are thirsty."
+        self.assertTrue(copy.re_reaction.search("You are thirsty."))
+
+    def test_invalid_pattern(self):
+        """Test that an invalid pattern is reported once and never matches."""
+        with self.assertLogs("cocomud.sharp", "WARNING") as logs:
+            self.add("^You (hit|miss", "say oops")
+            self.add("You are hungry.", "eat bread")
+            self.client.handle_lines("You hit.\r\nYou are hungry.")
+            self.client.handle_lines("You miss.")
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("^You (hit|miss", logs.output[0])
+        self.client.transport.write.assert_called_once_with(
+                b"eat bread\r\n")
+
+    def test_reset(self):
+        """Test that the compiled set follows the list of triggers."""
+        self.add("You are hungry.", "eat bread")
+        trigger_set = self.world.trigger_set
+        self.assertIs(self.world.trigger_set, trigger_set)
+        self.add("You are thirsty.", "drink")
+        self.assertIsNot(self.world.trigger_set, trigger_set)
+        self.client.handle_lines("You are thirsty.")
+        self.client.transport.write.assert_called_once_with(b"drink\r\n")
+
+    def test_same_as_full_scan(self):
+        """Compare the compiled set with testing every trigger."""
+        reactions = ["*", "", "a*", "*a", "ab*ba", "* tells you *",
+                "You tell *", "^tell", "^.*you", "aba", "bab", "ſtop",
+                "ΣΟΦΙΑ", "* says, '*'"]
+        triggers = [self.add(reaction) for reaction in reactions]
+        lines = ["", "a", "abba", "ababa", "Bob tells you hi",
+                "You tell Bob hi", "tell me", "stop", "σοφια",
+                "Alice says, 'you there?'", "bab", "nothing at all"]
+        trigger_set = TriggerSet(triggers)
+        for line in lines:
+            matches = [t for t in triggers if t.test(line)]
+            matches.sort(key=lambda t: len(t.reaction), reverse=True)
+            expected = matches[0] if matches else None
+            found = trigger_set.match(line)
+            found = found[0] if found else None
+            self.assertIs(found, expected, "line {}".format(repr(line)))
+
+    def test_worker(self):
+        """Test matching the lines in the trigger worker."""
+        self.add("You are hungry.", "eat bread")
+        self.add("You are thirsty.", "drink")
+        delivered = []
+        reactor = MagicMock()
+        reactor.callFromThread.side_effect = (
+                lambda function, *args: delivered.append((function, args)))
+        with patch.object(trigger_worker, "reactor", reactor):
+            worker = TriggerWorker(self.client)
+            self.client.worker = worker
+            worker.start()
+            for i in range(trigger_worker.HIGH_WATER):
+                self.client.handle_lines("You are thirsty.\nYou are hungry.")
+            worker.stop()
+            worker.thread.join()
+
+        self.client.transport.pauseProducing.assert_called_once_with()
+        self.client.transport.write.assert_not_called()
+        for function, args in delivered:
+            function(*args)
+
+        self.client.transport.resumeProducing.assert_called_once_with()
+        self.assertEqual(self.client.transport.write.call_args_list,
+                [call(b"drink\r\n"), call(b"eat bread\r\n")] * \
+                trigger_worker.HIGH_WATER)
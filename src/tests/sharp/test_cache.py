@@ -0,0 +1,89 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest.mock import patch
+import unittest
+
+from sharp import engine as engine_module
+from sharp.engine import SharpScript
+
+class TestCache(unittest.TestCase):
+
+    """Unittest for the cache of compiled SharpScript."""
+
+    def setUp(self):
+        """Create the SharpScript instance, recording sent commands."""
+        self.engine = SharpScript(None, None, None)
+        self.sent = []
+        self.engine.globals["send"] = self.sent.append
+
+    def test_hits(self):
+        """Test that the same code is only compiled once."""
+        self.engine.execute("#send north\n#send south")
+        self.engine.execute("#send north\n#send south")
+        self.assertEqual(self.sent, ["north", "south"] * 2)
+        info = self.engine.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["size"]),
+                (1, 1, 1))
+
+        # The same code with variables is compiled separately
+        self.engine.execute("#send north\n#send south", variables=True)
+        self.assertEqual(self.engine.cache_info()["misses"], 2)
+
+    def test_variables(self):
+        """Test that variables are replaced when the code runs."""
+        for hp in (10, 20):
+            self.engine.locals["hp"] = hp
+            self.engine.execute("#send {hp=$hp, \\$$hp}", variables=True)
+            self.engine.execute("#send $hp", variables=True)
+
+        self.assertEqual(self.sent, ["hp=10, $10", "10", "hp=20, $20", "20"])
+        self.assertEqual(self.engine.cache_info()["hits"], 2)
+
+    def test_lru(self):
+        """Test that the least recently used code is removed."""
+        with patch.object(engine_module, "CACHE_SIZE", 2):
+            self.engine.execute("#send 1")
+            self.engine.execute("#send 2")
+            self.engine.execute("#send 1")
+            self.engine.execute("#send 3")
+            self.assertIn(("#send 1", False), self.engine.compiled)
+            self.assertNotIn(("#send 2", False), self.engine.compiled)
+            self.engine.execute("#send 2")
+
+        info = self.engine.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["size"]),
+                (1, 4, 2))
+
+    def test_pause(self):
+        """Test that a random pause is picked when the code runs."""
+        self.assertEqual(self.engine.feed("#pause 2"), ["yield 2.0"])
+        self.assertEqual(self.engine.feed("#pause 1..3"),
+                ["yield pause('1..3')"])
+        self.assertEqual(self.engine.feed("#pause $delay", variables=True,
+                runtime=True), ["yield pause(replace_variables('$delay'))"])
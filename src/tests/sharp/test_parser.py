@@ -0,0 +1,86 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from textwrap import dedent
+import unittest
+
+from sharp.exceptions import SharpSyntaxError
+from sharp.parser import Parser, PythonCode, Statement
+
+class TestParser(unittest.TestCase):
+
+    """Unittest for the SharpScript parser."""
+
+    def test_positions(self):
+        """Test the positions of the nodes."""
+        content = dedent("""
+            {+
+                i = 1
+            }
+            #play file.wav
+              #trigger {You see *.} {
+                  look
+              } +mute
+        """.strip("\n"))
+        nodes, rest = Parser(content).parse(python=True)
+        self.assertEqual(rest.strip(), "")
+        self.assertIsInstance(nodes[0], PythonCode)
+        self.assertEqual(nodes[0].code, "i = 1")
+        self.assertEqual([type(node) for node in nodes[1:]],
+                [Statement, Statement])
+
+        play, trigger = nodes[1:]
+        self.assertEqual(play.as_tuple(), ("#play", "file.wav"))
+        self.assertEqual((play.line, trigger.line), (4, 5))
+        self.assertEqual(content[play.start:play.end], "#play file.wav")
+        self.assertEqual(content[trigger.start:trigger.end],
+                "#trigger {You see *.} {\n      look\n  } +mute")
+        self.assertEqual([argument.line for argument in trigger.arguments],
+                [5, 5, 7])
+
+    def test_first(self):
+        """Test reading only the first statement."""
+        nodes, rest = Parser("#play a.wav\n#stop\n").parse(first=True)
+        self.assertEqual([node.as_tuple() for node in nodes],
+                [("#play", "a.wav")])
+        self.assertEqual(rest, "\n#stop\n")
+
+    def test_unclosed(self):
+        """Test an unclosed brace."""
+        with self.assertRaises(SharpSyntaxError):
+            Parser("#play a.wav\n#trigger {ok} {look").parse()
+
+    def test_long(self):
+        """Test that a long script is read entirely."""
+        content = "\n".join("#alias a{} {{say {}}}".format(i, i) for i in \
+                range(5000))
+        nodes, rest = Parser(content).parse()
+        self.assertEqual(len(nodes), 5000)
+        self.assertEqual(nodes[-1].as_tuple(), ("#alias", "a4999",
+                "{say 4999}"))
+        self.assertEqual(nodes[-1].line, 5000)
@@ -0,0 +1,85 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest.mock import MagicMock
+import unittest
+
+from scripting.alias import Alias
+from scripting.trigger import Trigger
+from sharp.engine import SharpScript
+
+class TestProfiler(unittest.TestCase):
+
+    """Unittest for the profiling of scripts, triggers and aliases."""
+
+    def setUp(self):
+        """Create the SharpScript instance, recording sent commands."""
+        self.engine = SharpScript(MagicMock(), None, None)
+        self.sent = []
+        self.engine.functions["send"].run = self.sent.append
+        self.engine.set_profiling(False)
+        self.profiler = self.engine.profiler
+
+    def test_disabled(self):
+        """Test that nothing is recorded by default."""
+        self.engine.execute("#send north")
+        Trigger(self.engine, "You are hungry.", "").test("You are hungry.")
+        self.assertEqual(self.profiler.stats, {})
+        self.assertEqual(self.engine.globals["send"],
+                self.engine.functions["send"].run)
+
+    def test_enabled(self):
+        """Test the statistics recorded when profiling is enabled."""
+        self.engine.set_profiling(True)
+        self.engine.execute("#send north")
+        self.engine.execute("#send north")
+        trigger = Trigger(self.engine, "You are hungry.", "")
+        for line in ("You are hungry.", "You are thirsty."):
+            trigger.test(line)
+
+        alias = Alias(self.engine, "n", "#send north")
+        alias.test("n")
+        self.assertEqual(self.sent, ["north"] * 3)
+
+        stats = self.profiler.stats
+        self.assertEqual(stats["script", "#send north"].calls, 3)
+        # Aliases replace variables, their code is compiled separately
+        self.assertEqual(stats["compile", "#send north"].calls, 2)
+        self.assertEqual(stats["function", "send"].calls, 3)
+        trigger = stats["trigger", "You are hungry."]
+        self.assertEqual((trigger.calls, trigger.matches), (2, 1))
+        alias = stats["alias", "n"]
+        self.assertEqual((alias.calls, alias.matches), (1, 1))
+        self.assertEqual(len(self.profiler.report(2)), 2)
+
+        # The functions are restored when profiling is disabled
+        self.engine.set_profiling(False)
+        self.assertEqual(self.engine.globals["send"],
+                self.engine.functions["send"].run)
+        self.profiler.reset()
+        self.assertEqual(self.profiler.report(), [])
@@ -0,0 +1,117 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from unittest.mock import MagicMock, patch
+import unittest
+
+from twisted.internet.task import Clock
+
+from sharp import scheduler as scheduler_module
+from sharp.engine import SharpScript
+
+class TestScheduler(unittest.TestCase):
+
+    """Unittest for the scheduler of paused scripts."""
+
+    def setUp(self):
+        """Create the SharpScript instance, recording sent commands."""
+        self.engine = SharpScript(None, None, None)
+        self.sent = []
+        self.engine.globals["send"] = self.sent.append
+        self.scheduler = self.engine.scheduler
+        self.clock = self.scheduler.clock = Clock()
+
+    def test_timer(self):
+        """Test that a single timer is used for all paused scripts."""
+        for delay in (3, 1, 2):
+            self.engine.execute("#pause {}\n#send {}".format(delay, delay))
+
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.assertEqual(len(self.scheduler), 3)
+        self.clock.advance(1)
+        self.assertEqual(self.sent, ["1"])
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(2)
+        self.assertEqual(self.sent, ["1", "2", "3"])
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_kill(self):
+        """Test listing and stopping paused scripts."""
+        self.engine.execute("#pause 2\n#send first")
+        self.engine.execute("#pause 1\n#send second")
+        tasks = self.scheduler.list()
+        self.assertEqual([task.summary for task in tasks],
+                ["#pause 1 ...", "#pause 2 ..."])
+        self.assertEqual(self.scheduler.kill(tasks[0].id), 1)
+        self.assertEqual(self.scheduler.kill(tasks[0].id), 0)
+        self.clock.advance(2)
+        self.assertEqual(self.sent, ["first"])
+
+        # Stop all scripts
+        self.engine.execute("#pause 1\n#send first")
+        self.engine.execute("#pause 1\n#send second")
+        self.assertEqual(self.scheduler.kill(), 2)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_pending(self):
+        """Test the limit of paused scripts."""
+        with patch.object(scheduler_module, "MAX_PENDING", 2):
+            for i in range(3):
+                self.engine.execute("#pause 1\n#send {}".format(i))
+
+            self.assertEqual(len(self.scheduler), 2)
+            self.clock.advance(1)
+
+        self.assertEqual(self.sent, ["0", "1"])
+
+    def test_steps(self):
+        """Test the limit of steps of resumed scripts per second."""
+        with patch.object(scheduler_module, "MAX_STEPS", 3):
+            self.engine.execute("#pause 0\n" + "\n".join(
+                    "#send {}".format(i) for i in range(5)))
+            self.clock.advance(0)
+            self.assertEqual(self.sent, ["0", "1"])
+            self.clock.advance(1)
+
+        self.assertEqual(self.sent, ["0", "1", "2", "3", "4"])
+
+    def test_settings(self):
+        """Test that the limits are read in the settings."""
+        settings = {
+                "options.scripts.max_paused": 1,
+                "options.scripts.max_steps": 1000,
+        }
+        self.engine.engine = MagicMock()
+        self.engine.engine.settings.__getitem__ = MagicMock(
+                side_effect=settings.__getitem__)
+        client = self.engine.client = MagicMock()
+        self.engine.execute("#pause 1\n#send first")
+        self.engine.execute("#pause 1\n#send second")
+        self.assertEqual(len(self.scheduler), 1)
+        client.handle_message.assert_called_once_with("Too many paused " \
+                "scripts, the script '#pause 1 ...' has been stopped.")
@@ -0,0 +1,89 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from twisted.internet.task import Clock
+
+from sharp.engine import SharpScript
+from sharp.exceptions import SharpSyntaxError
+
+class TestScope(unittest.TestCase):
+
+    """Unittest for the scope of variables of scripts."""
+
+    def setUp(self):
+        """Create the SharpScript instance, recording sent commands."""
+        self.engine = SharpScript(None, None, None)
+        self.sent = []
+        self.engine.globals["send"] = self.sent.append
+        self.clock = self.engine.scheduler.clock = Clock()
+
+    def test_paused(self):
+        """Test that paused scripts keep their own arguments."""
+        code = "#send {first $1}\n#pause 1\n#send {then $1}"
+        for name in ("Alice", "Bob"):
+            self.engine.locals["args"] = {"1": name}
+            self.engine.execute(code, variables=True)
+
+        self.assertEqual(self.sent, ["first Alice", "first Bob"])
+        self.clock.advance(1)
+        self.assertEqual(self.sent[2:], ["then Alice", "then Bob"])
+
+    def test_functions(self):
+        """Test that functions see the names defined in the same block."""
+        code = "{+\nfactor = 3\ndef triple(x):\n    return x * factor\n" \
+                "result = triple(2)\nvalues = [x * factor for x in " \
+                "range(2)]\n+}\n#send $result"
+        self.engine.execute(code, variables=True)
+        self.assertEqual(self.sent, ["6"])
+        self.assertEqual(self.engine.locals["values"], [0, 3])
+
+    def test_written(self):
+        """Test that only the names written by the block are committed."""
+        self.engine.locals.update({"hp": 10, "sp": 5, "old": 1})
+        self.engine.execute("{+\nhp = sp + 1\ndel old\n+}", variables=True)
+        self.assertEqual(self.engine.locals, {"hp": 6, "sp": 5})
+        self.assertNotIn("send", self.engine.locals)
+
+    def test_yield(self):
+        """Test that Python blocks can't pause the script."""
+        for code in ("{+\nyield 1\n+}", "{+\nreturn\n+}"):
+            with self.assertRaises(SharpSyntaxError):
+                self.engine.execute(code)
+
+    def test_changed(self):
+        """Test that scripts only write the variables they modify."""
+        self.engine.locals.update({"hp": 10, "sp": 5})
+        self.engine.execute("{+\nhp = hp + 1\n}\n#pause 1\n#send $hp",
+                variables=True)
+        self.engine.locals["sp"] = 20
+        self.engine.locals["hp"] = 15
+        self.clock.advance(1)
+        self.assertEqual(self.engine.locals, {"hp": 15, "sp": 20})
+        self.assertEqual(self.sent, ["15"])
@@ -0,0 +1,73 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from logging import DEBUG, INFO
+from unittest.mock import patch
+import unittest
+
+from sharp.engine import SharpScript
+from sharp.template import compile_template
+
+class TestTemplate(unittest.TestCase):
+
+    """Unittest for the templates replacing variables."""
+
+    def test_pieces(self):
+        """Test the pieces of a compiled template."""
+        template = compile_template("HP: ${hp}/$max, \\$$1.")
+        self.assertEqual(template.pieces, ["HP: ", (False, "hp"), "/",
+                (False, "max"), ", $", (True, "1"), "."])
+        self.assertIs(compile_template("HP: ${hp}/$max, \\$$1."), template)
+        self.assertEqual(template.render({"hp": 5, "max": 10,
+                "args": {"1": "x"}}), "HP: 5/10, $x.")
+        self.assertEqual(template.render({}), "HP: /, $.")
+
+    def test_constant(self):
+        """Test a template without variables."""
+        template = compile_template("No \\$variable here")
+        self.assertEqual(template.constant, "No $variable here")
+        self.assertEqual(template.render({"variable": 1}),
+                "No $variable here")
+
+    def test_debug(self):
+        """Test that variables are only logged at the DEBUG level."""
+        engine = SharpScript(None, None, None)
+        engine.locals["hp"] = 3
+        level = engine.logger.level
+        try:
+            with patch.object(engine.logger, "debug") as debug:
+                engine.logger.setLevel(INFO)
+                self.assertEqual(engine.replace_variables("hp=$hp"), "hp=3")
+                debug.assert_not_called()
+                engine.logger.setLevel(DEBUG)
+                self.assertEqual(engine.replace_variables("hp=$hp"), "hp=3")
+                debug.assert_called_once_with(
+                        "#{} requests variable 'hp', value=3".format(
+                        engine.id))
+        finally:
+            engine.logger.setLevel(level)
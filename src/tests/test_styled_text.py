@@ -0,0 +1,72 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from styled_text import StyledText
+
+class TestStyledText(unittest.TestCase):
+
+    """Unittest for the StyledText class."""
+
+    def test_parse(self):
+        """Test parsing text with ANSI codes."""
+        styled = StyledText.parse("\x1b[1;31mRed\x1b[0m and plain")
+        self.assertEqual(styled.text, "Red and plain")
+        self.assertEqual(styled.codes, [(0, "1;31"), (3, "0")])
+
+        # Text without ANSI codes
+        styled = StyledText.parse("Nothing special")
+        self.assertEqual(styled.text, "Nothing special")
+        self.assertEqual(styled.codes, [])
+
+    def test_other_sequences(self):
+        """Test that sequences other than styles don't remove text."""
+        styled = StyledText.parse(
+                "\x1b[2JWelcome to the game\x1b[1;32m green\x1b[K.")
+        self.assertEqual(styled.text, "Welcome to the game green.")
+        self.assertEqual(styled.codes, [(19, "1;32")])
+        self.assertEqual(styled.ansi, "Welcome to the game\x1b[1;32m green.")
+
+    def test_splitlines(self):
+        """Test splitting a StyledText in lines."""
+        styled = StyledText.parse(
+                "\x1b[32mfirst\r\nsec\x1b[0mond\n\x1b[33m")
+        lines = styled.splitlines()
+        self.assertEqual([line.text for line in lines], ["first", "second"])
+        self.assertEqual(lines[0].codes, [(0, "32")])
+        self.assertEqual(lines[1].codes, [(3, "0"), (6, "33")])
+
+    def test_join(self):
+        """Test joining several StyledText."""
+        lines = [StyledText.parse("\x1b[32mfirst"),
+                StyledText.parse("sec\x1b[0mond")]
+        styled = StyledText.join("\r\n", lines)
+        self.assertEqual(styled.text, "first\r\nsecond")
+        self.assertEqual(styled.codes, [(0, "32"), (10, "0")])
+        self.assertEqual(styled.splitlines(), lines)
@@ -0,0 +1,193 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+import os
+
+from sharp.engine import SharpScript
+import world as world_module
+from world import World
+
+CONFIG = """
+#alias {co} {crew order}
+#channel ooc
+#macro F1 north
+#trigger {* tells you *} {#feed ooc $1} {} +mute
+""".lstrip()
+
+class WorldCacheTests(TestCase):
+
+    """Tests for the cache of the world's configuration."""
+
+    def setUp(self):
+        """Create a world in a temporary directory."""
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        os.makedirs(os.path.join(directory.name, "worlds", "test"))
+        self.engine = MagicMock()
+        self.engine.config_dir = directory.name
+        self.config = os.path.join(directory.name, "worlds", "test",
+                "config.set")
+        self.cache = os.path.join(directory.name, "worlds", "test",
+                "config.cache")
+
+    def load(self, content=None):
+        """Write the configuration if needed and load a new world."""
+        if content is not None:
+            with open(self.config, "w", encoding="utf-8") as file:
+                file.write(content)
+
+        world = World("test")
+        world.engine = self.engine
+        world.sharp_engine = SharpScript(self.engine, None, world)
+        world.sharp_engine.execute = MagicMock(
+                wraps=world.sharp_engine.execute)
+        world.load()
+        return world
+
+    def summary(self, world):
+        """Return a summary of the world's configuration."""
+        return (
+            [alias.sharp_script for alias in world.aliases],
+            [channel.name for channel in world.channels],
+            [macro.sharp_script for macro in world.macros],
+            [trigger.sharp_script for trigger in world.triggers],
+        )
+
+    def test_cache(self):
+        """Test that the cache rebuilds the same configuration."""
+        world = self.load(CONFIG)
+        world.sharp_engine.execute.assert_called_once()
+        self.assertTrue(os.path.exists(self.cache))
+        expected = self.summary(world)
+        self.assertEqual(len(world.triggers), 1)
+        self.assertTrue(world.triggers[0].mute)
+
+        world = self.load()
+        world.sharp_engine.execute.assert_not_called()
+        self.assertEqual(self.summary(world), expected)
+
+    def test_stale(self):
+        """Test that the script is executed when the cache is stale."""
+        self.load(CONFIG)
+        world = self.load(CONFIG + "#alias {n} {north}\n")
+        world.sharp_engine.execute.assert_called_once()
+        self.assertEqual(len(world.aliases), 2)
+
+        # A cache written by another version isn't used either
+        with patch.object(world_module, "BUILD", -1):
+            world = self.load()
+
+        world.sharp_engine.execute.assert_called_once()
+
+    def test_groups(self):
+        """Test that groups and disabled groups are saved."""
+        world = self.load(CONFIG + "#alias {k} {kill $1} combat\n" \
+                "#group combat off\n")
+        self.assertEqual(world.aliases.find("k").group, "combat")
+        self.assertEqual(world.disabled_groups, {"combat"})
+        world.enable_group("travel", False)
+        world.save_config()
+        with open(self.config, "r", encoding="utf-8") as file:
+            content = file.read()
+
+        self.assertIn("#alias k {kill $1} combat\n", content)
+        self.assertIn("#group combat off\n#group travel off\n", content)
+        world = self.load()
+        world.sharp_engine.execute.assert_not_called()
+        self.assertEqual(world.disabled_groups, {"combat", "travel"})
+        self.assertEqual(world.aliases.find("k").group, "combat")
+
+    def test_not_cachable(self):
+        """Test that scripts with other statements aren't cached."""
+        self.load(CONFIG + "#writevar hp 10\n")
+        self.assertFalse(os.path.exists(self.cache))
+
+    def test_corrupted(self):
+        """Test that a corrupted cache is ignored."""
+        self.load(CONFIG)
+        with open(self.cache, "w", encoding="utf-8") as file:
+            file.write("{not json")
+
+        world = self.load()
+        world.sharp_engine.execute.assert_called_once()
+        self.assertEqual(len(world.triggers), 1)
+
+
+class WorldCollectionTests(TestCase):
+
+    """Tests for the indexed collections of the world."""
+
+    def setUp(self):
+        """Create a world."""
+        self.world = World("test")
+        self.sharp = SharpScript(MagicMock(), None, self.world)
+
+    def test_conflicts(self):
+        """Test the conflicts when adding aliases, with both methods."""
+        execute = self.sharp.execute
+        execute("#alias {co} {crew order}\n#alias {n} {north}")
+        execute("#alias {co} {crew orders}")
+        self.assertEqual([alias.action for alias in self.world.aliases],
+                ["crew order", "north"])
+
+        # Replace the existing alias, keeping the order
+        self.world.merging = world_module.MergingMethod.replace
+        execute("#alias {co} {crew orders}")
+        self.assertEqual([alias.action for alias in self.world.aliases],
+                ["crew orders", "north"])
+
+    def test_replace_group(self):
+        """Test that replacing the group of an alias updates the set."""
+        execute = self.sharp.execute
+        execute("#alias {co} {crew order} idle\n#group idle off")
+        self.assertIsNone(self.world.alias_set.find("co"))
+        self.world.merging = world_module.MergingMethod.replace
+        execute("#alias {co} {crew order}")
+        self.assertIsNotNone(self.world.alias_set.find("co"))
+
+    def test_index(self):
+        """Test that the index follows modifications of the list."""
+        execute = self.sharp.execute
+        execute("#channel ooc\n#channel chat")
+        channels = self.world.channels
+        self.assertIs(channels.find("chat"), channels[1])
+        channels[:] = [channel for channel in channels
+                if channel.name != "ooc"]
+        self.assertIsNone(channels.find("ooc"))
+        execute("#channel ooc\n#feed ooc {Hello there}")
+        self.assertEqual(channels.find("ooc").messages, ["Hello there"])
+
+        # Replacing the list keeps the index
+        self.world.triggers = []
+        execute("#trigger {You are hungry.} {eat bread}")
+        self.assertIsNotNone(self.world.triggers.find("You are hungry."))
+        self.world.triggers.remove(self.world.triggers[0])
+        self.assertIsNone(self.world.triggers.find("You are hungry."))
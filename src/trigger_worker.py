@@ -0,0 +1,131 @@
+# Copyright (c) 2016-2020, LE GOFF Vincent
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+
+# * Neither the name of ytranslate nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""This file contains the TriggerWorker class.
+
+The TriggerWorker matches the lines received by a client against
+the world's triggers in a separate thread.  Only the matching is
+done in the worker thread:  the matches are sent back to the
+reactor, in the order the lines were received, and the triggers are
+executed there, as SharpScript expects.
+
+The worker lets the reactor handle other events (reading other
+sessions, sending commands, refreshing the interface) between the
+lines being matched.  It doesn't protect the application from a
+catastrophic regular expression, though:  the 're' module holds
+the GIL during a search, so a search that never ends blocks every
+thread, the reactor included.
+
+Text displayed without going through the triggers (messages of
+SharpScript functions, for instance) is handled directly and can
+be displayed before server lines still waiting in the worker.
+
+"""
+
+from queue import Queue
+import threading
+
+from twisted.internet import reactor
+
+from log import logger
+from styled_text import StyledText
+
+# Constants
+HIGH_WATER = 64
+LOW_WATER = 8
+
+class TriggerWorker:
+
+    """A thread matching lines against the triggers for a client.
+
+    Messages are submitted with 'submit' in the reactor thread.  When
+    more than 'HIGH_WATER' messages are waiting, the client stops
+    reading from its socket, until the number of waiting messages
+    drops to 'LOW_WATER'.
+
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.queue = Queue()
+        self.pending = 0
+        self.paused = False
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                name="TriggerWorker")
+
+    def start(self):
+        """Start the worker thread."""
+        self.thread.start()
+
+    def stop(self):
+        """Stop the worker after the submitted messages are matched."""
+        self.queue.put(None)
+
+    def submit(self, msg):
+        """Submit a message to be matched."""
+        self.pending += 1
+        self.queue.put(msg)
+        if self.pending >= HIGH_WATER and not self.paused:
+            self.paused = True
+            self.client.transport.pauseProducing()
+
+    def run(self):
+        """Match the messages in the worker thread.
+
+        The GIL is held during each search, so the reactor only runs
+        between searches (see above).
+
+        """
+        while True:
+            msg = self.queue.get()
+            try:
+                if msg is None:
+                    break
+
+                try:
+                    matches = list(self.client.match_lines(msg))
+                except Exception:
+                    log = logger("client")
+                    log.exception("An error occurred while matching " \
+                            "triggers")
+                    matches = [(StyledText.parse(line), None) for \
+                            line in msg.splitlines()]
+
+                reactor.callFromThread(self.deliver, matches)
+            finally:
+                self.queue.task_done()
+
+    def deliver(self, matches):
+        """Handle the matches in the reactor thread."""
+        self.pending -= 1
+        if self.paused and self.pending <= LOW_WATER:
+            self.paused = False
+            self.client.transport.resumeProducing()
+
+        with self.client.factory.world.lock:
+            self.client.handle_matches(matches)
@@ -168,12 +168,12 @@ class AliasDialog(wx.Dialog):
         # First, check that there hasn't been any modification
         dlg_aliases = {}
         for alias in self.alias_list:
-            dlg_aliases[alias.alias] = alias.action
+            dlg_aliases[alias.alias] = (alias.action, alias.group)
 
         # Active aliases
         act_aliases = {}
         for alias in self.world.aliases:
-            act_aliases[alias.alias] = alias.action
+            act_aliases[alias.alias] = (alias.action, alias.group)
 
         if dlg_aliases == act_aliases:
             self.EndModal(wx.ID_CANCEL)
@@ -221,6 +221,14 @@ class EditAliasDialog(wx.Dialog):
         top.Add(s_alias)
         top.Add((15, -1))
 
+        # Create the group field
+        s_group = wx.BoxSizer(wx.VERTICAL)
+        l_group = wx.StaticText(self, label=t("ui.message.alias.group"))
+        self.group = wx.TextCtrl(self, value=self.alias.group)
+        s_group.Add(l_group)
+        s_group.Add(self.group)
+        top.Add(s_group)
+
         # Main sizer
         sizer.Add(top, proportion=4)
 
@@ -252,7 +260,7 @@ class EditAliasDialog(wx.Dialog):
             alias = alias
             self.alias.alias = alias
             self.alias.action = action
-            self.alias.re_alias = self.alias.find_regex(self.alias.alias)
+            self.alias.group = self.group.GetValue().strip()
             if self.alias not in self.aliases:
                 self.aliases.append(self.alias)
             self.EndModal(wx.ID_OK)
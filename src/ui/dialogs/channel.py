@@ -95,7 +95,7 @@ class ChannelsDialog(wx.Dialog):
         dialog.Destroy()
 
         # If the name is already used
-        if name in [ch.name for ch in self.world.channels]:
+        if self.world.channels.find(name) is not None:
             wx.MessageBox(t("ui.message.channels.already"),
                     t("ui.alert.error"), wx.OK | wx.ICON_ERROR)
         else:
@@ -113,7 +113,7 @@ class ChannelsDialog(wx.Dialog):
         dialog.Destroy()
 
         # If the name is already used
-        if name not in [ch.name for ch in self.world.channels]:
+        if self.world.channels.find(name) is None:
             wx.MessageBox(t("ui.message.channels.unknown"),
                     t("ui.alert.error"), wx.OK | wx.ICON_ERROR)
         else:
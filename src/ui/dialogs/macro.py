@@ -326,6 +326,7 @@ class EditMacroDialog(wx.Dialog):
             self.macro.action = action
             if self.macro not in self.macros:
                 self.macros.append(self.macro)
+
             self.EndModal(wx.ID_OK)
 
     def OnCancel(self, e):
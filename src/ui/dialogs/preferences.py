@@ -197,9 +197,17 @@ class DisplayTab(wx.Panel):
         self.encodings = encodings
         self.PopulateList()
 
+        # Scrollback
+        l_scrollback = wx.StaticText(self,
+                label=t("ui.dialog.preferences.scrollback"))
+        self.scrollback = wx.SpinCtrl(self, min=0, max=1000000,
+                initial=self.engine.settings["options.output.scrollback"])
+
         # Append to the sizer
         sizer.Add(l_encodings)
         sizer.Add(encodings, proportion=4)
+        sizer.Add(l_scrollback)
+        sizer.Add(self.scrollback)
 
     def PopulateList(self):
         """Add the different encodings in the list."""
@@ -255,11 +263,33 @@ class InputTab(wx.Panel):
                 label=t("ui.dialog.preferences.auto_send_paste"))
         self.auto_send_paste.SetValue(settings["options.input.auto_send_paste"])
 
+        # Speedwalk prefix
+        l_speedwalk = wx.StaticText(self,
+                label=t("ui.dialog.preferences.speedwalk"))
+        self.speedwalk = wx.TextCtrl(self,
+                value=settings["options.input.speedwalk"])
+
+        # Send rate and burst
+        l_send_rate = wx.StaticText(self,
+                label=t("ui.dialog.preferences.send_rate"))
+        self.send_rate = wx.SpinCtrl(self, min=0, max=1000,
+                initial=settings["options.input.send_rate"])
+        l_send_burst = wx.StaticText(self,
+                label=t("ui.dialog.preferences.send_burst"))
+        self.send_burst = wx.SpinCtrl(self, min=1, max=1000,
+                initial=settings["options.input.send_burst"])
+
         # Append to the sizer
         sizer.Add(l_stacking, pos=(0, 0))
         sizer.Add(t_stacking, pos=(1, 0))
         sizer.Add(h_stacking, pos=(0, 1))
         sizer.Add(self.auto_send_paste, pos=(2, 0))
+        sizer.Add(l_send_rate, pos=(3, 0))
+        sizer.Add(self.send_rate, pos=(4, 0))
+        sizer.Add(l_send_burst, pos=(3, 1))
+        sizer.Add(self.send_burst, pos=(4, 1))
+        sizer.Add(l_speedwalk, pos=(5, 0))
+        sizer.Add(self.speedwalk, pos=(6, 0))
 
         # Event binding
         h_stacking.Bind(wx.EVT_BUTTON, self.OnHelpStacking)
@@ -425,24 +455,30 @@ class PreferencesDialog(wx.Dialog):
         auto_send_paste = input.auto_send_paste.GetValue()
         richtext = accessibility.richtext.GetValue()
         srs = accessibility.srs_on.GetValue()
+        scrollback = display.scrollback.GetValue()
         settings["options.general.language"] = new_language
         settings["options.general.encoding"] = encoding
         settings["options.general.screenreader"] = srs
         settings["options.input.command_stacking"] = command_stacking
         settings["options.input.auto_send_paste"] = auto_send_paste
+        settings["options.input.send_rate"] = input.send_rate.GetValue()
+        settings["options.input.send_burst"] = input.send_burst.GetValue()
+        settings["options.input.speedwalk"] = input.speedwalk.GetValue()
         settings["options.TTS.on"] = accessibility.TTS_on.GetValue()
         settings["options.TTS.outside"] = accessibility.TTS_outside.GetValue()
         settings["options.TTS.interrupt"] = interrupt
         settings["options.logging.automatic"] = logging.automatic.GetValue()
         settings["options.logging.commands"] = logging.commands.GetValue()
         settings["options.output.richtext"] = richtext
+        settings["options.output.scrollback"] = scrollback
         settings["options"].write()
         self.engine.TTS_on = accessibility.TTS_on.GetValue()
         self.engine.TTS_outside = accessibility.TTS_outside.GetValue()
 
-        # Repercute screen reader support
+        # Repercute screen reader support and scrollback
         for tab in self.window.tabs.GetChildren():
             tab.screenreader_support = srs
+            tab.scrollback = scrollback
 
         self.window.gameMenu.Check(
             self.window.chk_log.GetId(), logging.automatic.GetValue()
@@ -124,12 +124,46 @@ class SharpScriptConsoleDialog(wx.Dialog):
         self.TTS_on = session.engine.TTS_on
         self.TTS_outside = session.engine.TTS_outside
 
+        # Profiling
+        profiling = wx.BoxSizer(wx.HORIZONTAL)
+        self.profiling = wx.CheckBox(self,
+                label=t("ui.dialog.sharp_script_console.profiling"))
+        self.profile = wx.Button(self,
+                label=t("ui.dialog.sharp_script_console.profile"))
+        sharp_engine = session.sharp_engine
+        if sharp_engine:
+            self.profiling.SetValue(sharp_engine.profiler.enabled)
+        profiling.Add(self.profiling)
+        profiling.Add(self.profile)
+
         # Finish designing the window
         sizer.Add(self.panel)
+        sizer.Add(profiling)
         sizer.Fit(self)
 
         # Event binding
         self.Bind(wx.EVT_CLOSE, self.OnClose)
+        self.profiling.Bind(wx.EVT_CHECKBOX, self.OnProfiling)
+        self.profile.Bind(wx.EVT_BUTTON, self.OnProfile)
+
+    def OnProfiling(self, e):
+        """Enable or disable profiling."""
+        if self.session.sharp_engine:
+            self.session.sharp_engine.set_profiling(
+                    self.profiling.GetValue())
+
+    def OnProfile(self, e):
+        """Display the slowest scripts, triggers, aliases and functions."""
+        sharp_engine = self.session.sharp_engine
+        if sharp_engine:
+            lines = sharp_engine.profiler.report(20)
+            if lines:
+                self.panel.Send("\n".join(lines))
+            else:
+                self.panel.Send(t(
+                        "ui.dialog.sharp_script_console.no_profile"))
+
+        self.panel.output.SetFocus()
 
     def OnClose(self, e):
         """Close the console."""
@@ -161,6 +161,7 @@ class TriggerDialog(wx.Dialog):
             trigger.sharp_engine = self.world.sharp_engine
             triggers.append(trigger)
 
+        self.world.reset_triggers()
         self.world.save_config()
         self.EndModal(wx.ID_OK)
 
@@ -241,6 +242,31 @@ class EditTriggerDialog(wx.Dialog):
         self.mark.SetValue(self.trigger.mark)
         options.Add(self.mark)
 
+        # Fallthrough option
+        self.fallthrough = wx.CheckBox(self,
+                label=t("ui.message.trigger.fallthrough"))
+        self.fallthrough.SetValue(self.trigger.fallthrough)
+        options.Add(self.fallthrough)
+
+        # Priority
+        s_priority = wx.BoxSizer(wx.VERTICAL)
+        l_priority = wx.StaticText(self,
+                label=t("ui.message.trigger.priority"))
+        self.priority = wx.SpinCtrl(self, min=-100, max=100,
+                initial=self.trigger.priority)
+        s_priority.Add(l_priority)
+        s_priority.Add(self.priority)
+        top.Add(s_priority)
+        top.Add((15, -1))
+
+        # Group
+        s_group = wx.BoxSizer(wx.VERTICAL)
+        l_group = wx.StaticText(self, label=t("ui.message.trigger.group"))
+        self.group = wx.TextCtrl(self, value=self.trigger.group)
+        s_group.Add(l_group)
+        s_group.Add(self.group)
+        top.Add(s_group)
+
         # Substitution
         s_substitution = wx.BoxSizer(wx.VERTICAL)
         l_substitution = wx.StaticText(self,
@@ -270,6 +296,9 @@ class EditTriggerDialog(wx.Dialog):
         substitution = self.substitution.GetValue()
         mute = self.mute.GetValue()
         mark = self.mark.GetValue()
+        fallthrough = self.fallthrough.GetValue()
+        priority = self.priority.GetValue()
+        group = self.group.GetValue().strip()
         if not reaction:
             wx.MessageBox(t("ui.message.trigger.missing_reaction"),
                     t("ui.alert.missing"), wx.OK | wx.ICON_ERROR)
@@ -277,10 +306,12 @@ class EditTriggerDialog(wx.Dialog):
         else:
             self.trigger.reaction = reaction
             self.trigger.action = action
-            self.trigger.re_reaction = self.trigger.find_regex(reaction)
             self.trigger.substitution = substitution
             self.trigger.mute = mute
             self.trigger.mark = mark
+            self.trigger.fallthrough = fallthrough
+            self.trigger.priority = priority
+            self.trigger.group = group
             if self.trigger not in self.triggers:
                 self.triggers.append(self.trigger)
             self.EndModal(wx.ID_OK)
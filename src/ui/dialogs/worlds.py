@@ -232,6 +232,8 @@ class ExportWorldDialog(wx.Dialog):
             if triggers:
                 for trigger in self.world.triggers:
                     lines.append(trigger.sharp_script)
+                for event in self.world.events:
+                    lines.append(event.sharp_script)
 
             configuration = "\n".join(lines) + "\n"
 
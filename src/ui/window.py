@@ -43,9 +43,11 @@ from ytranslate.tools import t
 
 from autoupdate import AutoUpdate
 from log import logger
+from outbound import USER
 from screenreader import ScreenReader
 from scripting.key import key_name
 from session import Session
+from styled_text import StyledText
 from task.import_worlds import ImportWorlds
 from ui.dialogs.alias import AliasDialog
 from ui.dialogs.channel import ChannelsDialog
@@ -301,7 +303,6 @@ class ClientWindow(DummyUpdater):
         self.Bind(wx.EVT_ACTIVATE, self.OnActivate)
         self.tabs.Bind(wx.EVT_NOTEBOOK_PAGE_CHANGED, self.OnTabChanged)
         pub.subscribe(self.disconnectClient, "disconnect")
-        pub.subscribe(self.messageClient, "message")
 
     def OnCreate(self, e):
         """Open the dialog to add a new world."""
@@ -563,16 +564,6 @@ class ClientWindow(DummyUpdater):
             with self.lock:
                 panel.handle_disconnection(reason)
 
-    def messageClient(self, client, message, mark=None):
-        """A client receives a message."""
-        if not self:
-            return
-
-        panel = client.factory.panel
-        if panel:
-            with self.lock:
-                panel.handle_message(message, mark=mark)
-
     def OnResponseUpdate(self, build=None):
         """The check for updates has returned."""
         if self.loading:
@@ -600,6 +591,7 @@ class MUDPanel(AccessPanel):
                 ansi=self.rich, rich=self.rich)
         self.screenreader_support = engine.settings[
                 "options.general.screenreader"]
+        self.scrollback = engine.settings["options.output.scrollback"]
         if self.rich:
             self.output.SetForegroundColour(wx.WHITE)
             self.output.SetBackgroundColour(wx.BLACK)
@@ -679,37 +671,44 @@ class MUDPanel(AccessPanel):
             self.Send(message)
         ScreenReader.talk(message, interrupt=False)
 
-    def handle_message(self, message="", mark=None):
-        """The client has just received a message."""
-        point = self.editing_pos
+        # Report the use of the message queue
+        stats = self.flush_stats
+        if stats["flushes"]:
+            log = logger("ui")
+            log.debug("Displayed {} messages in {} flushes ({:.1f} " \
+                    "messages, {:.0f} characters per flush, maximum " \
+                    "queue depth {})".format(stats["messages"],
+                    stats["flushes"], stats["messages"] / stats["flushes"],
+                    stats["characters"] / stats["flushes"],
+                    stats["max_depth"]))
+
+    def FormatMessage(self, message):
+        """A message received by the client is about to be displayed."""
+        if isinstance(message, str):
+            message = StyledText.parse(message)
+
         lines = message.splitlines()
-        lines = [line for line in lines if line]
-        message = "\n".join(lines)
+        lines = [line for line in lines if line.text or line.codes]
+        message = StyledText.join("\n", lines)
         world = self.world
-        if world:
-            world.feed_words(message)
-
-        if not self:
-            return
-
-        self.Send(message, pos=mark)
-
-        # If there's a mark, move the cursor to it
-        if mark is not None:
-            log = logger("ui")
-            word = self.output.GetRange(point + mark, point + mark + 15)
-            log.debug("A mark has been detected, move to {} : {}".format(
-                    mark, repr(word)))
-            self.output.SetInsertionPoint(point + mark)
+        with self.window.lock:
+            if world:
+                world.feed_words(message.text)
 
         # Change the window title if not focused
         if self.focus and not self.inside:
-            if message.strip():
+            if message.text.strip():
                 self.nb_unread += 1
             if self.nb_unread > 0:
                 self.window.SetTitle("({}) {} [CocoMUD]".format(
                     self.nb_unread, world.name))
 
+        # Without rich text, the ANSI codes are simply ignored
+        if not self.rich:
+            message = message.text
+
+        return message
+
     def OnInput(self, message):
         """Some text has been sent from the input."""
         if self.world:
@@ -717,7 +716,7 @@ class MUDPanel(AccessPanel):
 
         with self.window.lock:
             try:
-                self.client.write(message)
+                self.client.write(message, priority=USER)
             except Exception:
                 log = logger("client")
                 log.exception("An error occurred when sending a message")
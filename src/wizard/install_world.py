@@ -174,7 +174,8 @@ class InstallWorld:
         destination.load()
 
         # Copy all the other files
-        to_skip = ("config.set", "install.py", "install.json", "options.conf")
+        to_skip = ("config.set", "config.cache", "install.py",
+                "install.json", "options.conf")
         for path, content in self.files.items():
             if path.endswith("/"):
                 # It's a folder, we skip it
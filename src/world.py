@@ -29,6 +29,8 @@
 """This file contains the World class."""
 
 from enum import Enum
+from hashlib import sha1
+import json
 import shutil
 import os
 import re
@@ -43,7 +45,17 @@ from character import Character
 from log import sharp as logger
 from notepad import Notepad
 from screenreader import ScreenReader
+from scripting.alias_set import AliasSet
+from scripting.collection import Collection
+from scripting.trigger_set import TriggerSet
 from session import Session
+from sharp.parser import Parser, Statement
+from version import BUILD
+
+# Constants
+CACHE_FORMAT = 3
+CACHED_FUNCTIONS = ("#alias", "#channel", "#event", "#group", "#macro",
+        "#trigger")
 
 class MergingMethod(Enum):
 
@@ -80,8 +92,10 @@ class World:
         # World's configuration
         self.aliases = []
         self.channels = []
+        self.events = []
         self.macros = []
         self.triggers = []
+        self.disabled_groups = set()
         self.notepad = None
         self.merging = MergingMethod.ignore
 
@@ -93,6 +107,132 @@ class World:
         return "<World {} (hostname={}, port={})>".format(
                 self.name, self.hostname, self.port)
 
+    @property
+    def aliases(self):
+        """Return the collection of aliases, indexed by alias."""
+        return self._aliases
+
+    @aliases.setter
+    def aliases(self, aliases):
+        """Replace the list of aliases."""
+        self._aliases = Collection(lambda alias: alias.alias, aliases,
+                self.reset_aliases)
+
+    @property
+    def channels(self):
+        """Return the collection of channels, indexed by name."""
+        return self._channels
+
+    @channels.setter
+    def channels(self, channels):
+        """Replace the list of channels."""
+        self._channels = Collection(lambda channel: channel.name, channels)
+
+    @property
+    def events(self):
+        """Return the collection of events, indexed by package."""
+        return self._events
+
+    @events.setter
+    def events(self, events):
+        """Replace the list of events."""
+        self._events = Collection(lambda event: event.package, events)
+
+    @property
+    def macros(self):
+        """Return the collection of macros, indexed by key and modifiers."""
+        return self._macros
+
+    @macros.setter
+    def macros(self, macros):
+        """Replace the list of macros."""
+        self._macros = Collection(lambda macro: (macro.key, macro.modifiers),
+                macros)
+        self._macros.on_change = self.reset_macros
+        self._macros.on_append = self.index_macro
+        self.reset_macros()
+
+    @property
+    def triggers(self):
+        """Return the collection of triggers, indexed by reaction."""
+        return self._triggers
+
+    @triggers.setter
+    def triggers(self, triggers):
+        """Replace the list of triggers."""
+        self._triggers = Collection(lambda trigger: trigger.reaction,
+                triggers, self.reset_triggers)
+
+    @property
+    def trigger_set(self):
+        """Return the compiled set of triggers, building it if needed.
+
+        The compiled set is rebuilt after the list of triggers has
+        been modified, or a group has been enabled or disabled.
+        Triggers of disabled groups aren't part of the compiled set.
+        Code that modifies a trigger in the list (its reaction or its
+        priority, for instance) should call 'reset_triggers'.
+
+        """
+        if self._trigger_set is None:
+            disabled = self.disabled_groups
+            self._trigger_set = TriggerSet([trigger
+                    for trigger in self._triggers
+                    if trigger.group not in disabled])
+
+        return self._trigger_set
+
+    def reset_triggers(self):
+        """Mark the compiled set of triggers as obsolete."""
+        self._trigger_set = None
+
+    @property
+    def alias_set(self):
+        """Return the indexed set of active aliases, building it if needed.
+
+        The set is rebuilt after the list of aliases has been
+        modified, or a group has been enabled or disabled.  Aliases
+        of disabled groups aren't part of the set.
+
+        """
+        if self._alias_set is None:
+            disabled = self.disabled_groups
+            self._alias_set = AliasSet([alias for alias in self._aliases
+                    if alias.group not in disabled])
+
+        return self._alias_set
+
+    def reset_aliases(self):
+        """Mark the indexed set of aliases as obsolete."""
+        self._alias_set = None
+
+    def reset_macros(self):
+        """Rebuild the index of macros used to test keystrokes.
+
+        The 'macro_index' dictionary, from (key, modifiers) to macro,
+        is replaced when rebuilt, and only receives single insertions
+        otherwise (see 'index_macro'), so it can be read without
+        holding the world's lock.  Code that modifies the key or
+        modifiers of a macro in the list should call
+        'self.macros.reindex()'.
+
+        """
+        self.macro_index = dict(self._macros.index)
+
+    def index_macro(self, macro):
+        """Add an appended macro to the index of macros."""
+        self.macro_index.setdefault((macro.key, macro.modifiers), macro)
+
+    def enable_group(self, name, enabled=True):
+        """Enable or disable a group of triggers and aliases."""
+        if enabled:
+            self.disabled_groups.discard(name)
+        else:
+            self.disabled_groups.add(name)
+
+        self.reset_aliases()
+        self.reset_triggers()
+
     @property
     def path(self):
         """Return the path to the world."""
@@ -111,22 +251,30 @@ class World:
         # Reset some of the world's configuration
         self.aliases = []
         self.channels = []
+        self.events = []
         self.macros = []
         self.triggers = []
+        self.disabled_groups = set()
 
         path = self.path
         path = os.path.join(path, "config.set")
         if os.path.exists(path):
+            with open(path, "rb") as file:
+                data = file.read()
+
             try:
-                with open(path, "r", encoding="utf-8") as file:
-                    content = file.read()
+                content = data.decode("utf-8")
             except UnicodeDecodeError:
-                with open(path, "r", encoding="latin-1") as file:
-                    content = file.read()
-                    to_save = True
+                content = data.decode("latin-1")
+                to_save = True
 
-            # Execute the script
-            self.sharp_engine.execute(content, variables=False)
+            # Rebuild the configuration from the cache if it's up to date,
+            # otherwise execute the script
+            digest = sha1(data).hexdigest()
+            if not self.load_cache(digest):
+                self.sharp_engine.execute(content, variables=False)
+                if not to_save and self.is_cachable(content):
+                    self.save_cache(digest)
 
         # Put the engine level back
         self.engine.level = level
@@ -200,11 +348,140 @@ class World:
         for trigger in self.triggers:
             lines.append(trigger.sharp_script)
 
+        # Events
+        for event in self.events:
+            lines.append(event.sharp_script)
+
+        # Disabled groups
+        for name in sorted(self.disabled_groups):
+            lines.append(self.sharp_engine.format((("#group", name, "off"), )))
+
         content = "\n".join(lines) + "\n"
+        data = content.encode("utf-8")
         path = self.path
         path = os.path.join(path, "config.set")
-        with open(path, "w", encoding="utf-8") as file:
-            file.write(content)
+        with open(path, "wb") as file:
+            file.write(data)
+
+        self.save_cache(sha1(data).hexdigest())
+
+    @staticmethod
+    def is_cachable(content):
+        """Return whether the configuration script can be cached.
+
+        The cache only contains aliases, channels, events, groups,
+        macros and triggers.  A script with Python code or other
+        statements has to be executed every time.
+
+        """
+        try:
+            nodes, _ = Parser(content).parse(python=True)
+        except ValueError:
+            return False
+
+        for node in nodes:
+            if not isinstance(node, Statement):
+                return False
+
+            if node.function.lower() not in CACHED_FUNCTIONS:
+                return False
+
+        return True
+
+    def load_cache(self, digest):
+        """Rebuild the configuration from the 'config.cache' file.
+
+        The cache is only used if it was written by the same version
+        of the client, for a 'config.set' file of the same hash
+        (digest).  Return whether the cache has been used.
+
+        """
+        from scripting.alias import Alias
+        from scripting.channel import Channel
+        from scripting.event import Event
+        from scripting.macro import Macro
+        from scripting.trigger import Trigger
+
+        path = os.path.join(self.path, "config.cache")
+        sharp = self.sharp_engine
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+
+            if cache.get("format") != CACHE_FORMAT or \
+                    cache.get("version") != BUILD or \
+                    cache.get("hash") != digest:
+                return False
+
+            aliases = []
+            for data in cache["aliases"]:
+                alias = Alias(sharp, data["alias"], data["action"])
+                alias.group = data["group"]
+                aliases.append(alias)
+
+            channels = [Channel(self, name) for name in cache["channels"]]
+            events = [Event(sharp, event["package"], event["action"])
+                    for event in cache["events"]]
+            macros = [Macro(macro["key"], macro["modifiers"],
+                    macro["action"], sharp) for macro in cache["macros"]]
+            triggers = []
+            for data in cache["triggers"]:
+                trigger = Trigger(sharp, data["reaction"], data["action"],
+                        data["substitution"])
+                trigger.mute = data["mute"]
+                trigger.mark = data["mark"]
+                trigger.fallthrough = data["fallthrough"]
+                trigger.priority = data["priority"]
+                trigger.group = data["group"]
+                triggers.append(trigger)
+
+            disabled_groups = set(cache["disabled_groups"])
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            logger.exception("The cache of the world {} can't be " \
+                    "read".format(self.name))
+            return False
+
+        self.aliases = aliases
+        self.channels = channels
+        self.events = events
+        self.macros = macros
+        self.triggers = triggers
+        self.disabled_groups = disabled_groups
+        logger.debug("Loaded the world {} from its cache".format(self.name))
+        return True
+
+    def save_cache(self, digest):
+        """Write the 'config.cache' file for the current configuration."""
+        cache = {
+            "format": CACHE_FORMAT,
+            "version": BUILD,
+            "hash": digest,
+            "aliases": [{"alias": alias.alias, "action": alias.action,
+                    "group": alias.group} for alias in self.aliases],
+            "channels": [channel.name for channel in self.channels],
+            "events": [{"package": event.package, "action": event.action}
+                    for event in self.events],
+            "macros": [{"key": macro.key, "modifiers": macro.modifiers,
+                    "action": macro.action} for macro in self.macros],
+            "triggers": [{"reaction": trigger.reaction,
+                    "action": trigger.action,
+                    "substitution": trigger.substitution,
+                    "mute": trigger.mute, "mark": trigger.mark,
+                    "fallthrough": trigger.fallthrough,
+                    "priority": trigger.priority, "group": trigger.group}
+                    for trigger in self.triggers],
+            "disabled_groups": sorted(self.disabled_groups),
+        }
+
+        path = os.path.join(self.path, "config.cache")
+        try:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(cache, file)
+        except (OSError, TypeError, ValueError):
+            logger.exception("The cache of the world {} can't be " \
+                    "written".format(self.name))
 
     def remove(self):
         """Remove the world."""
@@ -226,28 +503,45 @@ class World:
         it or ignore the second one.
 
         """
-        for existing in self.aliases:
-            if existing.alias == alias.alias:
-                # There's a conflict, look at the 'merging' setting
-                if self.merging == MergingMethod.ignore:
-                    return
-                elif self.merging == MergingMethod.replace:
-                    existing.action = alias.action
-                    existing.level = alias.level
-                    return
+        existing = self.aliases.find(alias.alias)
+        if existing is not None:
+            # There's a conflict, look at the 'merging' setting
+            if self.merging == MergingMethod.replace:
+                existing.action = alias.action
+                existing.group = alias.group
+                existing.level = alias.level
+                self.reset_aliases()
+            return
 
         # Otherwise, just add it at the end
         self.aliases.append(alias)
 
     def add_channel(self, channel):
         """Add a channel, handling conflicts."""
-        for existing in self.channels:
-            if existing.name == channel.name:
-                return
+        if self.channels.find(channel.name) is not None:
+            return
 
         # Otherwise, just add it at the end
         self.channels.append(channel)
 
+    def add_event(self, event):
+        """Add the event to the world's configuration, handling conflicts.
+
+        If another event on the same package exists, either replace
+        it or ignore the second one.
+
+        """
+        existing = self.events.find(event.package)
+        if existing is not None:
+            # There's a conflict, look at the 'merging' setting
+            if self.merging == MergingMethod.replace:
+                existing.action = event.action
+                existing.level = event.level
+            return
+
+        # Otherwise, just add it at the end
+        self.events.append(event)
+
     def add_macro(self, macro):
         """Add the macro to the world's configuration, handling conflicts.
 
@@ -255,15 +549,13 @@ class World:
         it or ignore the second one.
 
         """
-        for existing in self.macros:
-            if existing.shortcut == macro.shortcut:
-                # There's a conflict, look at the 'merging' setting
-                if self.merging == MergingMethod.ignore:
-                    return
-                elif self.merging == MergingMethod.replace:
-                    existing.action = macro.action
-                    existing.level = macro.level
-                    return
+        existing = self.macros.find((macro.key, macro.modifiers))
+        if existing is not None:
+            # There's a conflict, look at the 'merging' setting
+            if self.merging == MergingMethod.replace:
+                existing.action = macro.action
+                existing.level = macro.level
+            return
 
         # Otherwise, just add it at the end
         self.macros.append(macro)
@@ -275,19 +567,22 @@ class World:
         it or ignore the second one.
 
         """
-        for existing in self.triggers:
-            if existing.reaction == trigger.reaction:
-                # There's a conflict, look at the 'merging' setting
-                if self.merging == MergingMethod.ignore:
-                    return
-                elif self.merging == MergingMethod.replace:
-                    existing.action = trigger.action
-                    existing.mute = trigger.mute
-                    existing.level = trigger.level
-                    return
+        existing = self.triggers.find(trigger.reaction)
+        if existing is not None:
+            # There's a conflict, look at the 'merging' setting
+            if self.merging == MergingMethod.replace:
+                existing.action = trigger.action
+                existing.mute = trigger.mute
+                existing.fallthrough = trigger.fallthrough
+                existing.priority = trigger.priority
+                existing.group = trigger.group
+                existing.level = trigger.level
+                self.reset_triggers()
+            return
 
         # Otherwise, just add it at the end
         self.triggers.append(trigger)
+        self.reset_triggers()
 
     def reset_autocompletion(self):
         """Erase the list of possible choices in for the auto completion."""